@@ -6,15 +6,29 @@ from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import Optional
+import hashlib
+import time
 
+from ..core.cache import LRUCache
 from ..core.config import settings
+from ..db.database import AsyncSessionLocal
 from ..models.user_model import User
 
 security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Tokens déjà vérifiés : empreinte SHA-256 -> payload, conservé jusqu'à l'expiration du token
+_token_cache = LRUCache(max_size=settings.TOKEN_CACHE_SIZE)
+
+# Statut des comptes : user_id -> {is_active, is_admin} (None = inexistant), TTL court
+_user_status_cache = LRUCache(
+    max_size=settings.USER_STATUS_CACHE_SIZE,
+    ttl_seconds=settings.USER_STATUS_CACHE_TTL_SECONDS
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Vérifie si le mot de passe correspond au hash"""
@@ -57,21 +71,120 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
+def _token_digest(token: str) -> str:
+    """Clé de cache d'un token (le token lui-même n'est pas conservé)"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def verify_token(token: str) -> dict:
-    """Vérifie et décode un token JWT"""
+    """
+    Vérifie et décode un token JWT
+    
+    Les tokens valides sont mis en cache (clé : empreinte SHA-256) jusqu'à
+    leur champ `exp` : un token déjà vu ne repasse pas par jwt.decode.
+    Les tokens refusés ne sont pas mis en cache.
+    """
+    digest = _token_digest(token)
+    cached = _token_cache.get(digest)
+    if cached is not None:
+        return cached
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Token invalide")
-        return {"user_id": user_id, "email": payload.get("sub")}
+        token_data = {"user_id": user_id, "email": payload.get("sub")}
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expiré")
     except JWTError:
         raise HTTPException(status_code=401, detail="Token invalide")
-
-
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
-    """Récupère l'utilisateur actuel depuis le token"""
+    
+    # Sans `exp`, le token n'expire pas : il est gardé au plus TOKEN_CACHE_MAX_TTL_SECONDS
+    ttl = settings.TOKEN_CACHE_MAX_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if settings.TOKEN_CACHE_SIZE > 0 and ttl > 0:
+        _token_cache.set(digest, token_data, ttl_seconds=ttl)
+    return token_data
+
+
+async def get_user_status(user_id: int) -> dict:
+    """
+    Statut d'un utilisateur : {"is_active": ..., "is_admin": ...}
+    
+    Servi depuis un cache en mémoire de durée USER_STATUS_CACHE_TTL_SECONDS ;
+    une requête Postgres n'est faite qu'en cas d'absence ou d'expiration.
+    is_active vaut None si l'utilisateur n'existe pas.
+    """
+    cached = _user_status_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(User.is_active, User.is_admin).where(User.id == user_id)
+        )).first()
+    # NULL (lignes anciennes) = valeur par défaut : actif, non administrateur
+    flags = {
+        "is_active": None if row is None else row.is_active is not False,
+        "is_admin": row is not None and row.is_admin is True,
+    }
+    _user_status_cache.set(user_id, flags)
+    return flags
+
+
+def invalidate_user_status(user_id: int):
+    """
+    Oublie le statut en cache d'un utilisateur (à appeler après modification)
+    
+    L'invalidation est locale au processus : les autres workers voient le
+    changement au plus tard après USER_STATUS_CACHE_TTL_SECONDS.
+    """
+    _user_status_cache.pop(user_id)
+
+
+def get_token_cache() -> LRUCache:
+    """Cache des tokens vérifiés"""
+    return _token_cache
+
+
+def get_user_status_cache() -> LRUCache:
+    """Cache du statut des utilisateurs"""
+    return _user_status_cache
+
+
+async def _current_user_flags(credentials: HTTPAuthorizationCredentials) -> tuple[int, dict]:
+    """Utilisateur du token et son statut ; 401 s'il n'existe pas, 403 s'il est désactivé"""
     token_data = verify_token(credentials.credentials)
-    return token_data["user_id"]
\ No newline at end of file
+    flags = await get_user_status(token_data["user_id"])
+    if flags["is_active"] is None:
+        raise HTTPException(status_code=401, detail="Utilisateur inconnu")
+    if not flags["is_active"]:
+        raise HTTPException(status_code=403, detail="Compte désactivé")
+    return token_data["user_id"], flags
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
+    """
+    Récupère l'utilisateur actuel depuis le token
+    
+    Refuse les comptes supprimés (401) ou désactivés (403), même si le
+    token est encore valide.
+    """
+    user_id, _ = await _current_user_flags(credentials)
+    return user_id
+
+
+async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
+    """
+    Récupère l'utilisateur actuel et vérifie qu'il est administrateur
+    
+    Mêmes contrôles que get_current_user, puis 403 si le compte n'a pas
+    `is_admin` (lu avec le statut en cache, pas dans le token : un retrait
+    des droits prend effet sans attendre l'expiration du token).
+    """
+    user_id, flags = await _current_user_flags(credentials)
+    if not flags["is_admin"]:
+        raise HTTPException(status_code=403, detail="Accès réservé aux administrateurs")
+    return user_id
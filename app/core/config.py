@@ -18,18 +18,109 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Auth caches: verified tokens (kept until their expiry, 0 = disabled),
+    # user is_active status (short TTL, invalidated on deactivation)
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_MAX_TTL_SECONDS: float = 3600
+    USER_STATUS_CACHE_SIZE: int = 10000
+    USER_STATUS_CACHE_TTL_SECONDS: float = 30
+    
     # Database
     DATABASE_URL: str
+    # Async driver URL (derived from DATABASE_URL with asyncpg if unset)
+    ASYNC_DATABASE_URL: Optional[str] = None
     
     # RAG Configuration
     PDF_PATH: str = "/app/data/raw/data.pdf"
+    # Directory of manuals to index (overrides PDF_PATH when set)
+    PDF_DIR: Optional[str] = None
     CHROMA_PERSIST_DIR: str = "/tmp/chroma"
     EMBEDDING_MODEL: str = "BAAI/bge-small-en-v1.5"
     CHUNK_SIZE: int = 300
     CHUNK_OVERLAP: int = 50
+    # PDF ingestion: extraction processes (0 = CPU count) and pages per task
+    INGEST_WORKERS: int = 0
+    INGEST_PAGES_PER_TASK: int = 16
+    
+    # Retrieval depth: start with RETRIEVAL_INITIAL_K neighbours and widen to
+    # MAX_RESULTS only when they are bunched together: the k-th is within
+    # RETRIEVAL_WIDEN_MAX_SPREAD (squared L2) of the best, which is itself
+    # under DISTANCE_THRESHOLD
+    ADAPTIVE_RETRIEVAL: bool = True
+    RETRIEVAL_INITIAL_K: int = 8
+    RETRIEVAL_WIDEN_MAX_SPREAD: float = 0.1
+    MAX_RESULTS: int = 30
+    DISTANCE_THRESHOLD: float = 1.2
+    MIN_RESULTS: int = 5
+    # Dense search backend: "chroma" (HNSW) or "flat" (exact, memory-mapped
+    # NumPy matrix built at indexing time; Chroma stays the source of truth)
+    VECTOR_BACKEND: str = "chroma"
+    FLAT_INDEX_DTYPE: str = "float32"
+    # Hybrid retrieval: BM25 candidates fused with dense results (RRF)
+    HYBRID_RETRIEVAL: bool = True
+    BM25_RESULTS: int = 10
+    RRF_K: int = 60
+    # Approximate token budget of the retrieved context sent to the LLM
+    CONTEXT_TOKEN_BUDGET: int = 1500
+    
+    # Embedding micro-batching
+    EMBEDDING_BATCHING_ENABLED: bool = True
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+    
+    # Question embedding cache (TTL 0 = no expiry)
+    EMBEDDING_CACHE_SIZE: int = 2048
+    EMBEDDING_CACHE_TTL_SECONDS: float = 0
+    
+    # Question categorization: "kmeans" or "nearest" (nearest reference question)
+    CLUSTERING_METHOD: str = "kmeans"
+    # Fitted clustering model, reused across restarts and workers
+    CLUSTERING_ARTIFACT_DIR: str = "/app/data/models/clustering"
+    
+    # Online clustering updates (background partial_fit)
+    CLUSTER_ONLINE_UPDATES: bool = True
+    CLUSTER_UPDATE_INTERVAL_SECONDS: float = 30
+    CLUSTER_UPDATE_BATCH_SIZE: int = 64
+    
+    # Semantic answer cache (TTL 0 = no expiry)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_SIMILARITY: float = 0.95
+    ANSWER_CACHE_TTL_SECONDS: float = 3600
+    
+    # Write-behind query log: rows are queued and inserted in batches of
+    # QUERY_LOG_BATCH_SIZE or every QUERY_LOG_FLUSH_SECONDS (false = insert per request)
+    QUERY_LOG_ASYNC: bool = True
+    QUERY_LOG_QUEUE_SIZE: int = 10000
+    QUERY_LOG_BATCH_SIZE: int = 200
+    QUERY_LOG_FLUSH_SECONDS: float = 1.0
+    QUERY_LOG_ENQUEUE_TIMEOUT_SECONDS: float = 2.0
+    
+    # Batch queries (/query/batch): max questions per request, concurrent LLM calls
+    BATCH_MAX_QUESTIONS: int = 500
+    BATCH_LLM_CONCURRENCY: int = 8
+    
+    # Keyset pagination (/users/, /query/history) and NDJSON exports (rows per DB round-trip)
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 500
+    EXPORT_PAGE_SIZE: int = 1000
+    
+    # Analytics rollups (/admin/analytics): refresh period, rows per transaction,
+    # and time since insert before a logged query is aggregated (covers late commits)
+    ANALYTICS_ROLLUP_ENABLED: bool = True
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: float = 60
+    ANALYTICS_ROLLUP_CHUNK: int = 50000
+    ANALYTICS_ROLLUP_LAG_SECONDS: float = 10
     
     # LLM Configuration  
     LLM_MODEL: str = "gemini-2.5-flash"
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_TIMEOUT_SECONDS: float = 30
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 8
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30
     
     # API Keys
     HF_TOKEN: Optional[str] = None
@@ -0,0 +1,198 @@
+"""In-process metrics (fixed-bucket histograms, counters, Prometheus text format)"""
+from bisect import bisect_left
+from typing import Optional, Sequence
+import threading
+
+
+def _label_text(labels: dict, extra: Optional[dict] = None) -> str:
+    """Prometheus label set, e.g. {stage="llm",le="0.5"}"""
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items.items()) + "}"
+
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed upper bounds.
+
+    Observations are counted in the first bucket whose upper bound is
+    greater than or equal to the value (values above the last bound go
+    to an implicit +Inf bucket). Quantiles are estimated from the
+    bucket bounds, clamped to the largest one.
+    """
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float],
+                 labels: Optional[dict] = None):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name
+            description: Human-readable description
+            buckets: Increasing bucket upper bounds
+            labels: Constant labels (one histogram per label set)
+        """
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.labels = dict(labels or {})
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float):
+        """Record one observation"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def _quantile(self, q: float, counts: list, total: int) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def stats(self) -> dict:
+        """
+        Histogram snapshot.
+
+        Returns:
+            Dict with count, sum, mean, estimated p50/p95 and cumulative buckets
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum = self._count, self._sum
+
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = total
+
+        return {
+            "count": total,
+            "sum": round(value_sum, 6),
+            "mean": value_sum / total if total else 0.0,
+            "p50": self._quantile(0.5, counts, total) if total else None,
+            "p95": self._quantile(0.95, counts, total) if total else None,
+            "buckets": cumulative,
+        }
+
+    def prometheus_lines(self) -> list[str]:
+        """Samples in Prometheus text exposition format (without HELP/TYPE)"""
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum = self._count, self._sum
+
+        lines, running = [], 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, {'le': bound})} {running}")
+        lines.append(f"{self.name}_bucket{_label_text(self.labels, {'le': '+Inf'})} {total}")
+        lines.append(f"{self.name}_sum{_label_text(self.labels)} {value_sum}")
+        lines.append(f"{self.name}_count{_label_text(self.labels)} {total}")
+        return lines
+
+
+class Counter:
+    """Thread-safe monotonic counter"""
+
+    def __init__(self, name: str, description: str, labels: Optional[dict] = None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+    def stats(self) -> int:
+        return self.value
+
+    def prometheus_lines(self) -> list[str]:
+        return [f"{self.name}{_label_text(self.labels)} {self.value}"]
+
+
+_registry: dict[tuple, object] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(kind: str, name: str, labels: Optional[dict], factory):
+    key = (kind, name, tuple(sorted((labels or {}).items())))
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = factory()
+        return _registry[key]
+
+
+def histogram(name: str, description: str, buckets: Sequence[float],
+              labels: Optional[dict] = None) -> Histogram:
+    """
+    Get or create a histogram.
+
+    Args:
+        name: Metric name
+        description: Human-readable description
+        buckets: Increasing bucket upper bounds (used on creation only)
+        labels: Constant labels, e.g. {"stage": "llm"}
+
+    Returns:
+        The shared Histogram for this name and label set
+    """
+    return _get_or_create(
+        "histogram", name, labels, lambda: Histogram(name, description, buckets, labels)
+    )
+
+
+def counter(name: str, description: str, labels: Optional[dict] = None) -> Counter:
+    """Get or create a counter (see histogram)"""
+    return _get_or_create("counter", name, labels, lambda: Counter(name, description, labels))
+
+
+def _display_name(metric) -> str:
+    return metric.name + _label_text(metric.labels)
+
+
+def all_histograms() -> dict[str, Histogram]:
+    """Registered histograms by name (with labels)"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {_display_name(m): m for m in metrics if isinstance(m, Histogram)}
+
+
+def all_counters() -> dict[str, Counter]:
+    """Registered counters by name (with labels)"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {_display_name(m): m for m in metrics if isinstance(m, Counter)}
+
+
+def render_prometheus() -> str:
+    """
+    Every registered metric in Prometheus text exposition format.
+
+    Returns:
+        Text for a /metrics endpoint (HELP/TYPE once per metric name)
+    """
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: (m.name, _label_text(m.labels)))
+
+    lines, described = [], set()
+    for metric in metrics:
+        if metric.name not in described:
+            described.add(metric.name)
+            kind = "histogram" if isinstance(metric, Histogram) else "counter"
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+        lines.extend(metric.prometheus_lines())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,157 @@
+"""Circuit breaker and concurrency limit guarding the LLM client"""
+from collections import deque
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM cannot be called (circuit open or saturated)"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail fast for `reset_seconds`. Then a single trial call is let
+    through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """closed, open or half-open"""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return "open"
+            return "half-open"
+
+    def before_call(self) -> bool:
+        """
+        Check whether a call may proceed.
+
+        Returns:
+            True if the call is the half-open trial; the caller must then
+            call release_trial() once it ends, whatever the outcome
+
+        Raises:
+            LLMUnavailableError: If the circuit is open
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_in_flight:
+                raise LLMUnavailableError("LLM circuit breaker is open")
+            self._trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """
+        End the half-open trial without an outcome.
+
+        A trial cancelled or closed before completing (client disconnect)
+        neither closes nor reopens the circuit; the next call gets a new
+        trial. No-op once record_success/record_failure has run.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"LLM circuit opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+
+class ConcurrencyLimit:
+    """
+    Slot counter shared by threads and event-loop tasks.
+
+    Blocking and async callers draw from the same `limit` slots, so
+    mixing both never exceeds it. Async waiters are woken from
+    release() (possibly on another thread) and retry; cancelling a
+    waiting task does not consume a slot.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._async_waiters = deque()
+
+    def _try_acquire(self) -> bool:
+        # Called with self._cond held
+        if self._in_use < self.limit:
+            self._in_use += 1
+            return True
+        return False
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a slot (blocking)"""
+        with self._cond:
+            return self._cond.wait_for(self._try_acquire, timeout)
+
+    async def acquire_async(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a slot without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    return True
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(waiter[1], remaining)
+                except asyncio.TimeoutError:
+                    return False
+            finally:
+                with self._cond:
+                    try:
+                        self._async_waiters.remove(waiter)
+                    except ValueError:
+                        pass
+
+    def release(self):
+        """Free a slot and wake the waiters"""
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+            waiters = list(self._async_waiters)
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._wake, future)
+
+    @staticmethod
+    def _wake(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
@@ -0,0 +1,105 @@
+"""Per-query tracing of pipeline stages"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import asyncio
+import functools
+import threading
+import time
+
+from .metrics import histogram
+
+# Stages recorded per query (one `<stage>_ms` column each on `queries`)
+STAGES = ("embedding", "clustering", "retrieval", "context", "llm")
+
+_STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("rag_trace", default=None)
+
+
+class Trace:
+    """
+    Timings and counters of one query.
+
+    The trace is stored in a context variable, so it follows the request
+    into `asyncio.to_thread` workers; stages add to it from wherever they
+    run. Durations of a stage entered several times are summed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages_ms: dict[str, float] = {}
+        self.retrieved_docs: Optional[int] = None
+        self.context_tokens: Optional[int] = None
+        self.cache_hit = False
+
+    def add_stage(self, name: str, elapsed_ms: float):
+        with self._lock:
+            self.stages_ms[name] = self.stages_ms.get(name, 0.0) + elapsed_ms
+
+    def columns(self) -> dict:
+        """Values for the tracing columns of a Query row"""
+        columns = {
+            f"{name}_ms": round(self.stages_ms[name], 2) if name in self.stages_ms else None
+            for name in STAGES
+        }
+        columns.update(
+            retrieved_docs=self.retrieved_docs,
+            context_tokens=self.context_tokens,
+            cache_hit=self.cache_hit,
+        )
+        return columns
+
+
+def start_trace() -> Trace:
+    """Start tracing the current request (replaces any previous trace)"""
+    trace = Trace()
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace of the current request, None outside a traced request"""
+    return _current.get()
+
+
+def record_stage(name: str, seconds: float):
+    """
+    Record the duration of a pipeline stage.
+
+    The duration is always observed in the `rag_stage_seconds` histogram
+    and added to the current trace when there is one.
+    """
+    histogram("rag_stage_seconds", "Time spent per pipeline stage", _STAGE_BUCKETS,
+              labels={"stage": name}).observe(seconds)
+    trace = _current.get()
+    if trace is not None:
+        trace.add_stage(name, seconds * 1000)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as pipeline stage `name` (see record_stage)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def traced(name: str):
+    """Decorator timing every call of a function (sync or async) as stage `name`"""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
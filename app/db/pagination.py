@@ -0,0 +1,103 @@
+"""Keyset (cursor) pagination on (created_at, id)"""
+from datetime import datetime
+from typing import AsyncIterator, Optional
+import base64
+import json
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(row) -> str:
+    """Opaque cursor pointing after `row` (needs created_at and id)"""
+    payload = json.dumps([row.created_at.isoformat(), row.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        InvalidCursorError: Malformed cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+
+
+def page_size(limit: Optional[int]) -> int:
+    """Requested page size, PAGE_SIZE_DEFAULT when unset, clamped to [1, PAGE_SIZE_MAX]"""
+    if limit is None:
+        return settings.PAGE_SIZE_DEFAULT
+    return max(1, min(limit, settings.PAGE_SIZE_MAX))
+
+
+def paginate(stmt: Select, model, cursor: Optional[str], limit: int, descending: bool = False) -> Select:
+    """
+    Restrict `stmt` to the page after `cursor`.
+
+    Rows are ordered by (created_at, id), so the page boundary is a
+    single index range seek instead of an OFFSET scan: the cost of a
+    page does not depend on how deep it is. One extra row is fetched
+    to know whether there is a next page (see fetch_page).
+
+    Args:
+        stmt: Select on `model` (filters already applied)
+        model: Mapped class with created_at and id columns
+        cursor: Cursor of the previous page, None for the first page
+        limit: Page size
+        descending: Newest first
+    """
+    key = tuple_(model.created_at, model.id)
+    if cursor is not None:
+        after = tuple_(*decode_cursor(cursor))
+        stmt = stmt.where(key < after if descending else key > after)
+    if descending:
+        stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        stmt = stmt.order_by(model.created_at, model.id)
+    return stmt.limit(limit + 1)
+
+
+async def fetch_page(db: AsyncSession, stmt: Select, model, cursor: Optional[str], limit: int,
+                     descending: bool = False) -> tuple[list, Optional[str]]:
+    """
+    Fetch one page.
+
+    Returns:
+        Tuple of (rows, cursor of the next page or None on the last page)
+    """
+    rows = list((await db.execute(paginate(stmt, model, cursor, limit, descending))).scalars())
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+async def iter_rows(db: AsyncSession, stmt: Select, model, page_size: int,
+                    descending: bool = False) -> AsyncIterator:
+    """
+    Iterate over every row of `stmt`, one keyset page at a time.
+
+    At most `page_size` rows are held in memory, and each page is an
+    index seek, so a full export runs in constant memory whatever the
+    table size. The session is expunged after each page.
+    """
+    cursor = None
+    while True:
+        rows, cursor = await fetch_page(db, stmt, model, cursor, page_size, descending)
+        for row in rows:
+            yield row
+        db.expunge_all()
+        if cursor is None:
+            return
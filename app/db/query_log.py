@@ -0,0 +1,153 @@
+"""Write-behind logger for Query rows"""
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from sqlalchemy import insert
+
+from ..core.config import settings
+from ..models.query_model import Query
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Queued after the last row on shutdown
+_STOP = object()
+
+
+class QueryLogWriter:
+    """
+    Batches Query inserts off the request path.
+
+    Rows are put in a bounded asyncio queue and a background task writes
+    them with one multi-row INSERT per batch, when QUERY_LOG_BATCH_SIZE
+    rows are waiting or QUERY_LOG_FLUSH_SECONDS after the first one.
+
+    Backpressure: when the queue is full, submit() waits for room (up to
+    QUERY_LOG_ENQUEUE_TIMEOUT_SECONDS) and then inserts the row itself,
+    so a slow database slows requests down instead of losing rows or
+    growing memory. Remaining rows are flushed on shutdown.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.direct_writes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    def start(self):
+        """Start the flush task (call from the running event loop)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.QUERY_LOG_QUEUE_SIZE)
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="query-log-writer")
+        logger.info("Query log writer started")
+
+    async def stop(self):
+        """Stop the flush task after writing every queued row"""
+        if not self.running:
+            return
+        # New rows are written directly from now on; queued ones are flushed first
+        self._stopping = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"Query log writer stopped ({self.written} rows written)")
+
+    async def submit(self, row: dict):
+        """
+        Queue one Query row (column name -> value).
+
+        Returns once the row is queued, not written. Falls back to a
+        direct insert if the writer is not running or the queue stays full.
+        """
+        await self.submit_many([row])
+
+    async def submit_many(self, rows: list[dict]):
+        """Queue several Query rows (see submit)"""
+        if not self.running:
+            await self._write(rows, direct=True)
+            return
+
+        for index, row in enumerate(rows):
+            try:
+                await asyncio.wait_for(
+                    self._queue.put(row), settings.QUERY_LOG_ENQUEUE_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Query log queue full, writing directly")
+                await self._write(rows[index:], direct=True)
+                return
+
+    async def _write(self, rows: list[dict], direct: bool = False):
+        """Insert rows in one multi-row INSERT (errors are logged, not raised)"""
+        if not rows:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(Query), rows)
+                await db.commit()
+            self.written += len(rows)
+            if direct:
+                self.direct_writes += len(rows)
+            else:
+                self.flushes += 1
+        except Exception as e:
+            self.failed += len(rows)
+            logger.error(f"Failed to write {len(rows)} query log rows: {e}")
+
+    async def _next_batch(self) -> tuple[list[dict], bool]:
+        """
+        Wait for a first row, then collect until the batch is full or the window ends.
+
+        Returns:
+            Tuple of (rows, stop requested)
+        """
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + settings.QUERY_LOG_FLUSH_SECONDS
+        while len(batch) < settings.QUERY_LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        while True:
+            batch, stopping = await self._next_batch()
+            await self._write(batch)
+            if stopping:
+                return
+
+    def stats(self) -> dict:
+        """Queue depth and write counters"""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "direct_writes": self.direct_writes,
+        }
+
+
+# Shared writer instance (started in the app lifespan)
+query_log_writer = QueryLogWriter()
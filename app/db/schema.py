@@ -0,0 +1,97 @@
+"""Additive schema upgrades applied at startup"""
+import logging
+
+from sqlalchemy import Index, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+# Serializes upgrades when several workers start at once (pg advisory lock key)
+SCHEMA_LOCK_KEY = 7_214_000
+
+# Validity of an index by name (a failed CONCURRENTLY build leaves it invalid)
+_INDEX_VALID = text("""
+    SELECT i.indisvalid
+    FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+    WHERE c.relname = :name
+""")
+
+
+def upgrade_schema(engine: Engine):
+    """
+    Bring existing tables up to the models.
+
+    `Base.metadata.create_all` only creates missing tables, and init.sql
+    only runs on an empty data volume, so columns and indexes added to a
+    model later never reach an existing database. This adds them:
+
+    - missing nullable columns (`ALTER TABLE ... ADD COLUMN IF NOT EXISTS`)
+    - missing indexes declared on the models (`CREATE INDEX CONCURRENTLY`)
+
+    Only additive changes are made. A missing NOT NULL column without a
+    server default cannot be added safely to a populated table and is
+    logged as an error instead.
+
+    Args:
+        engine: Sync engine (call after create_all)
+    """
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+
+        declared_indexes = []
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    logger.error(f"Cannot add NOT NULL column {table.name}.{column.name}, migrate it manually")
+                    continue
+                definition = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN IF NOT EXISTS {definition}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+            declared_indexes += table.indexes
+
+    # Checked by name in pg_index rather than with the inspector, which
+    # also lists invalid indexes
+    if declared_indexes:
+        _create_indexes_concurrently(engine, declared_indexes)
+
+
+def _create_indexes_concurrently(engine: Engine, indexes: list[Index]):
+    """
+    Build the missing indexes without blocking writes to their tables.
+
+    CREATE INDEX CONCURRENTLY cannot run inside a transaction, so this
+    uses an autocommit connection and a session-level advisory lock. An
+    invalid index left by an interrupted build is dropped and rebuilt.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            for index in indexes:
+                _create_index_concurrently(conn, index)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+
+def _create_index_concurrently(conn: Connection, index: Index):
+    valid = conn.scalar(_INDEX_VALID, {"name": index.name})
+    if valid:
+        return
+    if valid is False:
+        logger.warning(f"Rebuilding invalid index {index.name}")
+        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+    conn.execute(text(ddl.replace(" INDEX IF NOT EXISTS ", " INDEX CONCURRENTLY IF NOT EXISTS ", 1)))
+    logger.info(f"Created index {index.name}")
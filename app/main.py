@@ -1,20 +1,73 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
+import logging
 
 # Imports relatifs depuis le package courant
-from .routes import getAllUsers_router, login_router, register_router, query_router, admin_router
+from .routes import getAllUsers_router, login_router, register_router, query_router, admin_router, analytics_router
 from .db.database import Base, engine
+from .db.query_log import query_log_writer
+from .db.schema import upgrade_schema
+from .core.config import settings
+from .core.metrics import render_prometheus
+from .rag.pipeline import init_pipeline, startup_status
+from .services.analytics import rollup_scheduler
 # Import models to ensure they are registered with Base
 from . import models
 
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up_pipeline():
+    """Charge le pipeline RAG en arrière-plan (modèle, Chroma, clustering)"""
+    try:
+        await asyncio.to_thread(init_pipeline)
+    except Exception:
+        logger.exception("Échec du démarrage du pipeline RAG")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarre le pipeline sans bloquer les routes non-RAG"""
+    warm_up = asyncio.create_task(_warm_up_pipeline())
+    if settings.QUERY_LOG_ASYNC:
+        query_log_writer.start()
+    if settings.ANALYTICS_ROLLUP_ENABLED:
+        rollup_scheduler.start()
+    yield
+    await rollup_scheduler.stop()
+    if not warm_up.done():
+        warm_up.cancel()
+    # Écrire les requêtes encore en file avant l'arrêt
+    await query_log_writer.stop()
+
+
 # Créer l'application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
-# Créer les tables si elles n'existent pas
+# Créer les tables si elles n'existent pas, puis ajouter colonnes et index
+# apparus depuis (init.sql ne s'exécute que sur un volume vide)
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 # Inclure les routers
 app.include_router(register_router.router)
 app.include_router(login_router.router)
 app.include_router(getAllUsers_router.router)
 app.include_router(query_router.router)
-app.include_router(admin_router.router)
\ No newline at end of file
+app.include_router(admin_router.router)
+app.include_router(analytics_router.router)
+
+
+@app.get("/ready")
+def ready():
+    """Readiness : 200 quand le pipeline RAG est chargé, 503 sinon"""
+    status = startup_status()
+    return JSONResponse(status_code=200 if status["status"] == "ready" else 503, content=status)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Histogrammes et compteurs du pipeline au format Prometheus"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,77 @@
+"""Pre-aggregated query analytics (rollup tables)"""
+from sqlalchemy import BigInteger, Column, Date, DateTime, Float, Integer, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from ..db.database import Base
+
+
+class QueryStatsHourly(Base):
+    """
+    Query volume and latency per hour and cluster.
+
+    Attributes:
+        hour: Start of the hour (UTC)
+        cluster: Assigned category ("Uncategorized" when none)
+        query_count: Number of queries
+        latency_sum_ms: Sum of latencies (for the mean)
+        latency_buckets: Query counts per latency bucket (see
+            services.analytics.LATENCY_BUCKETS_MS, last bucket is +Inf);
+            summed across rows to compute percentiles
+    """
+    __tablename__ = "query_stats_hourly"
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    cluster = Column(String(255), primary_key=True)
+    query_count = Column(BigInteger, nullable=False)
+    latency_sum_ms = Column(Float, nullable=False)
+    latency_buckets = Column(ARRAY(BigInteger), nullable=False)
+
+
+class UserQueryStatsDaily(Base):
+    """
+    Query volume per day and user.
+
+    Attributes:
+        day: Day (UTC)
+        user_id: User ID
+        query_count: Number of queries
+        latency_sum_ms: Sum of latencies (for the mean)
+    """
+    __tablename__ = "user_query_stats_daily"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    query_count = Column(BigInteger, nullable=False)
+    latency_sum_ms = Column(Float, nullable=False)
+
+
+class QuestionStatsDaily(Base):
+    """
+    Occurrences of each question per day.
+
+    Attributes:
+        day: Day (UTC)
+        question_hash: md5 of the lowercased, trimmed question
+        question: Question text (first occurrence)
+        query_count: Number of times asked
+    """
+    __tablename__ = "question_stats_daily"
+
+    day = Column(Date, primary_key=True)
+    question_hash = Column(String(32), primary_key=True)
+    question = Column(Text, nullable=False)
+    query_count = Column(BigInteger, nullable=False)
+
+
+class RollupState(Base):
+    """
+    Incremental rollup watermark.
+
+    Attributes:
+        name: Rollup name
+        last_query_id: Highest queries.id already aggregated
+    """
+    __tablename__ = "analytics_rollup_state"
+
+    name = Column(String(64), primary_key=True)
+    last_query_id = Column(BigInteger, nullable=False, default=0)
@@ -1,5 +1,5 @@
 """Query database model"""
-from sqlalchemy import Column, Integer, Float, Text, DateTime, ForeignKey, String
+from sqlalchemy import Boolean, Column, Integer, Float, Text, DateTime, ForeignKey, Index, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -17,9 +17,22 @@ class Query(Base):
         answer: RAG-generated answer
         cluster: Assigned category/cluster
         latency_ms: Response time in milliseconds
-        created_at: Timestamp
+        time_to_first_token_ms: Time until the first streamed answer token (streaming only)
+        incomplete: Streamed answer cut off by an LLM error (partial text stored)
+        embedding_ms, clustering_ms, retrieval_ms, context_ms, llm_ms: Per-stage timings
+        retrieved_docs: Documents returned by the vector search
+        context_tokens: Estimated tokens of context sent to the LLM
+        cache_hit: Answer served from the semantic answer cache
+        created_at: Timestamp (request time, set by the app)
+        inserted_at: Row insert time, set by Postgres (analytics rollup watermark)
     """
     __tablename__ = "queries"
+    __table_args__ = (
+        # Per-cluster time ranges (analytics drill-down, rollup backfills)
+        Index("idx_queries_cluster_created_at", "cluster", "created_at"),
+        # Keyset pagination of a user's history (/query/history)
+        Index("idx_queries_user_created_at_id", "user_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -27,7 +40,21 @@ class Query(Base):
     answer = Column(Text, nullable=False)
     cluster = Column(String, nullable=True)
     latency_ms = Column(Float, nullable=False)
-    created_at = Column(DateTime, server_default=func.now())
+    time_to_first_token_ms = Column(Float, nullable=True)
+    incomplete = Column(Boolean, nullable=True)
+    
+    # Per-stage tracing (NULL for rows written before tracing or by batch queries)
+    embedding_ms = Column(Float, nullable=True)
+    clustering_ms = Column(Float, nullable=True)
+    retrieval_ms = Column(Float, nullable=True)
+    context_ms = Column(Float, nullable=True)
+    llm_ms = Column(Float, nullable=True)
+    retrieved_docs = Column(Integer, nullable=True)
+    context_tokens = Column(Integer, nullable=True)
+    cache_hit = Column(Boolean, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Never set by the app: write-behind rows can reach the table long after created_at
+    inserted_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationship
     user = relationship("User", back_populates="queries")
\ No newline at end of file
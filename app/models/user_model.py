@@ -1,7 +1,7 @@
 """
 Modèles SQLAlchemy pour PostgreSQL
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -10,11 +10,17 @@ from ..db.database import Base
 class User(Base):
     """Table des utilisateurs"""
     __tablename__ = "users"
+    __table_args__ = (
+        # Pagination par curseur de /users/
+        Index("idx_users_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
+    # Droits d'administration (export, désactivation, /admin) ; NULL = non
+    is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relation : un utilisateur a plusieurs queries
@@ -0,0 +1,120 @@
+"""Semantic cache of generated answers"""
+from typing import Optional
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Cache of recent answers looked up by question similarity.
+
+    Question embeddings are stored L2-normalized in a fixed-size ring
+    buffer, so a lookup is a single matrix-vector product. A cached
+    answer is returned when the best cosine similarity reaches
+    `threshold`.
+    """
+
+    def __init__(self, max_size: int = 512, threshold: float = 0.95,
+                 ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of cached answers (oldest replaced first)
+            threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Entry lifetime in seconds (None or 0 disables expiry)
+        """
+        self.max_size = max(1, max_size)
+        self.threshold = threshold
+        self.ttl = ttl_seconds or None
+        self._lock = threading.Lock()
+        self._reset()
+        self.hits = 0
+        self.misses = 0
+
+    def _reset(self):
+        """Drop all entries (caller holds the lock or is __init__)"""
+        self._matrix = None
+        self._entries = [None] * self.max_size
+        self._expires = np.full(self.max_size, -np.inf)
+        self._next = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding) -> Optional[tuple[str, str]]:
+        """
+        Find a cached answer for a similar question.
+
+        Args:
+            embedding: Question embedding
+
+        Returns:
+            Tuple of (answer, cluster) on hit, None on miss
+        """
+        query = self._normalize(embedding)
+
+        with self._lock:
+            if self._matrix is None:
+                self.misses += 1
+                return None
+
+            scores = self._matrix @ query
+            scores[self._expires <= time.monotonic()] = -np.inf
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return self._entries[best]
+
+    def store(self, embedding, answer: str, cluster: str):
+        """
+        Cache an answer, replacing the oldest entry when full.
+
+        Args:
+            embedding: Question embedding
+            answer: Generated answer
+            cluster: Assigned category
+        """
+        vector = self._normalize(embedding)
+        expires_at = time.monotonic() + self.ttl if self.ttl else np.inf
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+            slot = self._next
+            self._matrix[slot] = vector
+            self._entries[slot] = (answer, cluster)
+            self._expires[slot] = expires_at
+            self._next = (slot + 1) % self.max_size
+
+    def invalidate(self):
+        """Drop all cached answers (e.g. after the vector store is reindexed)"""
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> dict:
+        """
+        Cache metrics.
+
+        Returns:
+            Dict with size, hits, misses and hit rate
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": sum(entry is not None for entry in self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,148 @@
+"""LLM context assembly from retrieved chunks"""
+from dataclasses import dataclass, field
+from typing import Optional
+import logging
+import re
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used to size the LLM context
+CHARS_PER_TOKEN = 4
+
+# Shortest suffix/prefix match treated as splitter overlap (avoids
+# stitching on a coincidental shared word)
+MIN_OVERLAP_CHARS = 12
+
+# Word-shingle Jaccard similarity above which a passage is a near-duplicate
+NEAR_DUPLICATE_SIMILARITY = 0.85
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text (no tokenizer call)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    words = text.split()
+    if len(words) <= size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def _stitch(left: str, right: str) -> str:
+    """Join consecutive chunks, dropping the text repeated by the splitter overlap"""
+    longest = min(len(left), len(right), settings.CHUNK_OVERLAP * 2)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return f"{left} {right}"
+
+
+@dataclass
+class _Section:
+    """Chunks of one page, kept at the rank of their best chunk"""
+    header: str
+    # (chunk_index or None, rank, text); every retrieved chunk is kept, even
+    # when two share a chunk_index (duplicates are dropped by build_context)
+    chunks: list = field(default_factory=list)
+
+    def passages(self) -> list[str]:
+        """Runs of consecutive chunks, each stitched into one passage"""
+        indexed = sorted((c for c in self.chunks if c[0] is not None), key=lambda c: c[:2])
+        unindexed = [c for c in self.chunks if c[0] is None]
+        passages, previous = [], None
+        for index, _, text in indexed + unindexed:
+            if passages and previous is not None and index is not None and index == previous + 1:
+                passages[-1] = _stitch(passages[-1], text)
+            else:
+                passages.append(text)
+            previous = index
+        return passages
+
+
+def _header(metadata: dict) -> str:
+    page = metadata.get("page_number", "N/A")
+    document = metadata.get("document")
+    return f"[Page {page} | {document}]" if document else f"[Page {page}]"
+
+
+def _sections(results: list[dict]) -> list[_Section]:
+    """Group PDF chunks by page in rank order (predefined questions are skipped)"""
+    sections = {}
+    for rank, r in enumerate(results):
+        metadata = r.get("metadata") or {}
+        if not r.get("document") or metadata.get("source") == "predefined":
+            continue
+
+        if metadata.get("page_number") is None:
+            key = ("rank", rank)
+        else:
+            key = (metadata.get("document"), metadata["page_number"])
+        section = sections.setdefault(key, _Section(header=_header(metadata)))
+        section.chunks.append((metadata.get("chunk_index"), rank, r["document"].strip()))
+    return list(sections.values())
+
+
+def build_context(results: list[dict], token_budget: Optional[int] = None) -> str:
+    """
+    Assemble the LLM context from ranked search results.
+
+    - Predefined questions (`source: predefined`) are left out.
+    - Consecutive chunks of the same page are merged into one passage
+      and the overlap repeated by the splitter is removed.
+    - Passages contained in, or nearly identical to, an already kept
+      passage are dropped.
+    - Pages are added in rank order until the token budget is reached
+      (the best page is always kept, whatever its size).
+
+    Args:
+        results: Search results ({"document", "metadata", "distance"}), best first
+        token_budget: Estimated token budget (settings.CONTEXT_TOKEN_BUDGET if None)
+
+    Returns:
+        Context text, empty if no usable document remains
+    """
+    budget = settings.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    kept_texts, kept_shingles = [], []
+    parts, used, dropped = [], 0, 0
+
+    for section in _sections(results):
+        passages = []
+        for passage in section.passages():
+            normalized = _normalize(passage)
+            shingles = _shingles(normalized)
+            duplicate = any(normalized in kept for kept in kept_texts) or any(
+                len(shingles & other) / len(shingles | other) >= NEAR_DUPLICATE_SIMILARITY
+                for other in kept_shingles
+            )
+            if duplicate:
+                dropped += 1
+                continue
+            kept_texts.append(normalized)
+            kept_shingles.append(shingles)
+            passages.append(passage)
+
+        if not passages:
+            continue
+
+        part = section.header + "\n" + "\n[...]\n".join(passages)
+        tokens = estimate_tokens(part)
+        if parts and used + tokens > budget:
+            break
+        parts.append(part)
+        used += tokens
+
+    context = "\n\n---\n\n".join(parts)
+    logger.info(
+        f"Context: {len(parts)} pages from {len(results)} results "
+        f"({dropped} duplicate passages dropped), ~{estimate_tokens(context)} tokens"
+    )
+    return context
@@ -0,0 +1,29 @@
+"""Rank fusion of dense and lexical retrieval results"""
+
+
+def reciprocal_rank_fusion(*rankings: list[dict], k: int = 60) -> list[dict]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Each result scores sum(1 / (k + rank)) over the lists it appears in,
+    so documents ranked well by both retrievers come first without
+    having to calibrate distances against BM25 scores.
+
+    Args:
+        rankings: Result lists ({"id", "document", "metadata", ...}), best first
+        k: RRF smoothing constant (60 in the original paper)
+
+    Returns:
+        Merged results sorted by fused score (`rrf_score`). Fields missing
+        from one list (e.g. the dense distance) are taken from the other.
+    """
+    merged = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, 1):
+            entry = merged.setdefault(result["id"], dict(result, rrf_score=0.0))
+            for key, value in result.items():
+                if entry.get(key) is None:
+                    entry[key] = value
+            entry["rrf_score"] += 1.0 / (k + rank)
+
+    return sorted(merged.values(), key=lambda r: r["rrf_score"], reverse=True)
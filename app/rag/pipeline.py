@@ -1,11 +1,52 @@
 """RAG pipeline for question answering"""
-from ..services.vector_store import VectorStore
-from ..services.llm import generate_answer
+from ..services.vector_store import VectorStore, get_active_collection_name
+from ..services.embeddings import embed_texts, get_model
+from ..core.config import settings
+from ..core.metrics import counter, histogram
+from ..core.tracing import current_trace, stage
+from ..services.llm import (
+    AnswerStreamError, generate_answer, generate_answer_async, stream_answer_async, is_fallback_answer
+)
 from ..services.clustering import ClusteringService
+from .answer_cache import SemanticAnswerCache
+from .context_builder import build_context, estimate_tokens
+from .fusion import reciprocal_rank_fusion
+from .query_context import QueryContext
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# How often to check whether another worker switched the served collection
+ACTIVE_COLLECTION_CHECK_SECONDS = 10
+
+# `source` of book chunks; predefined questions share the collection but
+# are never used as context, so they must not take retrieval slots
+CORPUS_SOURCE = "PDF"
+
+RETRIEVAL_SECONDS = histogram(
+    "rag_retrieval_seconds", "Vector search time per question",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+RETRIEVED_DOCUMENTS = histogram(
+    "rag_retrieved_documents",
+    "Neighbours fetched by dense search per question (counts at MAX_RESULTS are widened searches)",
+    (5, 8, 10, 15, 20, 30, 50)
+)
+CONTEXT_TOKENS = histogram(
+    "rag_context_tokens", "Estimated tokens of retrieved context in the LLM prompt",
+    (250, 500, 750, 1000, 1500, 2000, 3000, 5000)
+)
+ANSWER_CACHE_HITS = counter(
+    "rag_answer_cache_lookups_total", "Semantic answer cache lookups", labels={"result": "hit"}
+)
+ANSWER_CACHE_MISSES = counter(
+    "rag_answer_cache_lookups_total", "Semantic answer cache lookups", labels={"result": "miss"}
+)
+
 
 class RAGPipeline:
     """
@@ -15,19 +56,97 @@ class RAGPipeline:
     to answer IT support questions.
     """
     
-    def __init__(self):
-        """Initialize pipeline components"""
-        self.vector_store = VectorStore()
-        self.clustering = ClusteringService()
+    def __init__(self, vector_store: VectorStore = None, clustering: ClusteringService = None):
+        """
+        Initialize pipeline components.
+        
+        Args:
+            vector_store: Already opened vector store (opened if None)
+            clustering: Already initialized clustering service (created if None)
+        """
+        self.vector_store = vector_store or VectorStore()
+        self._collection_checked_at = time.monotonic()
+        self.clustering = clustering or ClusteringService()
+        self.answer_cache = SemanticAnswerCache(
+            max_size=settings.ANSWER_CACHE_SIZE,
+            threshold=settings.ANSWER_CACHE_SIMILARITY,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+        )
         logger.info("RAG pipeline initialized")
 
-    def query(self, question: str, n_results: int = 30) -> tuple[str, str]:
+    def invalidate_caches(self):
+        """Drop cached answers (call after the vector store is reindexed)"""
+        self.answer_cache.invalidate()
+        logger.info("Answer cache invalidated")
+
+    def swap_vector_store(self, vector_store: VectorStore):
+        """
+        Serve queries from a new vector store.
+        
+        The swap is a single attribute assignment: queries already
+        running keep their reference and finish on the old collection.
+        
+        Args:
+            vector_store: Store opened on the freshly built collection
+        """
+        self.vector_store = vector_store
+        self.invalidate_caches()
+        logger.info(f"Now serving collection '{vector_store.collection_name}'")
+
+    def _current_vector_store(self) -> VectorStore:
+        """Live store, following a collection switch made by another worker"""
+        now = time.monotonic()
+        if now - self._collection_checked_at >= ACTIVE_COLLECTION_CHECK_SECONDS:
+            self._collection_checked_at = now
+            active = get_active_collection_name()
+            if active != self.vector_store.collection_name:
+                self.swap_vector_store(VectorStore(active))
+        return self.vector_store
+
+    def query(self, question: str, n_results: Optional[int] = None,
+              filters: Optional[dict] = None) -> tuple[str, str]:
         """
         Process a question through the RAG pipeline.
         
         Args:
             question: User's question
-            n_results: Number of documents to retrieve
+            n_results: Fixed number of documents to retrieve (adaptive depth if None)
+            filters: Metadata restricting retrieval (e.g. {"document": ..., "chapter": ...})
+            
+        Returns:
+            Tuple of (answer, cluster_category)
+        """
+        if not question.strip():
+            return "Please provide a valid question.", "Uncategorized"
+        
+        # Embed the question once for clustering and retrieval
+        ctx = QueryContext.from_question(question)
+        
+        cached = self._cached_answer(ctx, filters)
+        if cached is not None:
+            return cached
+        
+        cluster_id, results = self._retrieve(ctx, n_results, filters)
+        if results is None:
+            return self._no_results_answer(ctx), cluster_id
+        
+        # Generate answer using LLM
+        answer = generate_answer(ctx.question, self._build_context(results))
+        self._remember(ctx, answer, cluster_id, filters)
+        return answer, cluster_id
+
+    async def aquery(self, question: str, n_results: Optional[int] = None,
+                     filters: Optional[dict] = None) -> tuple[str, str]:
+        """
+        Async variant of query().
+        
+        Embedding, clustering and Chroma calls run in worker threads and
+        the LLM call is awaited, so the event loop is never blocked.
+        
+        Args:
+            question: User's question
+            n_results: Fixed number of documents to retrieve (adaptive depth if None)
+            filters: Metadata restricting retrieval
             
         Returns:
             Tuple of (answer, cluster_category)
@@ -35,46 +154,372 @@ class RAGPipeline:
         if not question.strip():
             return "Please provide a valid question.", "Uncategorized"
         
-        question = question.strip()
-        cluster_id = self.clustering.assign_cluster(question)
+        ctx = await asyncio.to_thread(QueryContext.from_question, question)
+        
+        cached = self._cached_answer(ctx, filters)
+        if cached is not None:
+            return cached
+        
+        cluster_id, results = await asyncio.to_thread(self._retrieve, ctx, n_results, filters)
+        if results is None:
+            return self._no_results_answer(ctx), cluster_id
+        
+        answer = await generate_answer_async(ctx.question, self._build_context(results))
+        self._remember(ctx, answer, cluster_id, filters)
+        return answer, cluster_id
+
+    async def astream(self, question: str, n_results: Optional[int] = None,
+                      filters: Optional[dict] = None) -> AsyncIterator[tuple[str, object]]:
+        """
+        Stream a question through the pipeline.
+        
+        Citations are emitted as soon as retrieval is done, then the
+        answer is emitted fragment by fragment as the LLM produces it.
+        
+        Args:
+            question: User's question
+            n_results: Fixed number of documents to retrieve (adaptive depth if None)
+            filters: Metadata restricting retrieval
+            
+        Yields:
+            ("citations", {"cluster": str, "pages": list}) once, then
+            ("token", str) for each answer fragment, then
+            ("error", {"detail": str}) if the LLM stream broke off; the
+            partial answer is then not cached
+        """
+        if not question.strip():
+            yield "citations", {"cluster": "Uncategorized", "pages": []}
+            yield "token", "Please provide a valid question."
+            return
+        
+        ctx = await asyncio.to_thread(QueryContext.from_question, question)
+        
+        cached = self._cached_answer(ctx, filters)
+        if cached is not None:
+            answer, cluster_id = cached
+            yield "citations", {"cluster": cluster_id, "pages": []}
+            yield "token", answer
+            return
+        
+        cluster_id, results = await asyncio.to_thread(self._retrieve, ctx, n_results, filters)
+        yield "citations", {"cluster": cluster_id, "pages": self._cited_pages(results or [])}
+        
+        if results is None:
+            yield "token", self._no_results_answer(ctx)
+            return
+        
+        parts = []
+        try:
+            async for fragment in stream_answer_async(ctx.question, self._build_context(results)):
+                parts.append(fragment)
+                yield "token", fragment
+        except AnswerStreamError as e:
+            logger.warning(f"Streamed answer truncated: {e}")
+            yield "error", {"detail": "The answer was interrupted, please retry."}
+            return
+        
+        self._remember(ctx, "".join(parts).strip(), cluster_id, filters)
+
+    async def query_many(self, questions: list[str],
+                         filters: Optional[dict] = None) -> AsyncIterator[tuple[int, str, str]]:
+        """
+        Answer a batch of questions, yielding each answer as soon as it is ready.
+        
+        All questions are embedded in one model call and searched in one
+        vector store call; LLM calls then run concurrently, at most
+        BATCH_LLM_CONCURRENCY at a time (interactive queries keep the rest
+        of the Gemini client's capacity).
+        
+        Args:
+            questions: Questions to answer
+            filters: Metadata restricting retrieval, shared by all questions
+            
+        Yields:
+            (index in `questions`, answer, cluster_category), in completion order
+        """
+        pending = []
+        for i, question in enumerate(questions):
+            if question.strip():
+                pending.append((i, question.strip()))
+            else:
+                yield i, "Please provide a valid question.", "Uncategorized"
+        if not pending:
+            return
+        
+        with stage("embedding"):
+            embeddings = await asyncio.to_thread(embed_texts, [q for _, q in pending])
+        
+        to_retrieve = []
+        for (i, question), embedding in zip(pending, embeddings):
+            ctx = QueryContext(question=question, embedding=embedding)
+            cached = self._cached_answer(ctx, filters)
+            if cached is not None:
+                yield (i, *cached)
+            else:
+                to_retrieve.append((i, ctx))
+        if not to_retrieve:
+            return
+        
+        retrieved = await asyncio.to_thread(
+            self._retrieve_many, [ctx for _, ctx in to_retrieve], None, filters
+        )
+        semaphore = asyncio.Semaphore(settings.BATCH_LLM_CONCURRENCY)
+        
+        async def answer(i, ctx, cluster_id, results):
+            if results is None:
+                return i, self._no_results_answer(ctx), cluster_id
+            async with semaphore:
+                text = await generate_answer_async(ctx.question, self._build_context(results))
+            self._remember(ctx, text, cluster_id, filters)
+            return i, text, cluster_id
+        
+        tasks = [
+            asyncio.create_task(answer(i, ctx, cluster_id, results))
+            for (i, ctx), (cluster_id, results) in zip(to_retrieve, retrieved)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Consumer gone (e.g. client disconnected): stop pending LLM calls
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _cacheable(filters: Optional[dict]) -> bool:
+        """Only unfiltered answers are cached (the cache is keyed by question alone)"""
+        return settings.ANSWER_CACHE_ENABLED and not any(
+            value is not None for value in (filters or {}).values()
+        )
+
+    def _cached_answer(self, ctx: QueryContext, filters: Optional[dict] = None) -> Optional[tuple[str, str]]:
+        """Serve near-identical questions from the answer cache"""
+        if not self._cacheable(filters):
+            return None
+        
+        cached = self.answer_cache.lookup(ctx.embedding)
+        if cached is None:
+            ANSWER_CACHE_MISSES.inc()
+            return None
+        
+        logger.info("Answer cache hit")
+        ANSWER_CACHE_HITS.inc()
+        trace = current_trace()
+        if trace is not None:
+            trace.cache_hit = True
+        return cached
+
+    def _remember(self, ctx: QueryContext, answer: str, cluster_id: str,
+                  filters: Optional[dict] = None):
+        """Cache a successful LLM answer"""
+        if self._cacheable(filters) and not is_fallback_answer(answer):
+            self.answer_cache.store(ctx.embedding, answer, cluster_id)
+
+    @staticmethod
+    def _no_results_answer(ctx: QueryContext) -> str:
+        return f"I couldn't find relevant information for: '{ctx.question}'."
+
+    def _retrieve(self, ctx: QueryContext, n_results: Optional[int] = None,
+                  filters: Optional[dict] = None) -> tuple[str, Optional[list[dict]]]:
+        """
+        Cluster the question and retrieve relevant documents.
+        
+        Args:
+            ctx: Query context with the question embedding
+            n_results: Fixed number of documents to retrieve (adaptive depth if None)
+            filters: Metadata pre-filter applied inside the vector search
+            
+        Returns:
+            Tuple of (cluster_category, filtered results), results is None if nothing was found
+        """
+        return self._retrieve_many([ctx], n_results, filters)[0]
+
+    def _retrieve_many(self, ctxs: list[QueryContext], n_results: Optional[int] = None,
+                       filters: Optional[dict] = None) -> list[tuple[str, Optional[list[dict]]]]:
+        """
+        Batch variant of _retrieve(): one vector search call for all questions.
+        
+        Returns:
+            One (cluster_category, filtered results) tuple per context
+        """
+        for ctx in ctxs:
+            logger.info(f"Processing question: {ctx.question}")
         
-        logger.info(f"Processing question: {question}")
-        results = self.vector_store.search(question, n_results=n_results)
+        start = time.perf_counter()
+        searched = self._search_many(ctxs, n_results, filters)
+        per_question = (time.perf_counter() - start) / max(1, len(ctxs))
         
+        trace = current_trace()
+        retrieved = []
+        for ctx, results in zip(ctxs, searched):
+            RETRIEVAL_SECONDS.observe(per_question)
+            if trace is not None:
+                trace.retrieved_docs = len(results)
+            cluster_id = self.clustering.assign_cluster(ctx.question, embedding=ctx.embedding)
+            retrieved.append((cluster_id, self._select_results(results)))
+        return retrieved
+
+    @staticmethod
+    def _select_results(results: list[dict]) -> Optional[list[dict]]:
+        """Apply the distance threshold, keeping at least MIN_RESULTS (None if empty)"""
         if not results:
             logger.warning("No results found in vector store")
-            return (
-                f"I couldn't find relevant information for: '{question}'.",
-                cluster_id
-            )
+            return None
         
         # Log search quality metrics
         distances = [r['distance'] for r in results[:5]]
         logger.info(f"Top 5 distances: {distances}")
         
-        # Filter by distance threshold
-        threshold = 1.2
-        filtered_results = [r for r in results if r['distance'] < threshold]
+        # Filter by distance threshold (lexical-only matches have no distance and are kept)
+        threshold = settings.DISTANCE_THRESHOLD
+        filtered_results = [
+            r for r in results if r['distance'] is None or r['distance'] < threshold
+        ]
         
-        # Keep at least top 5 results
-        if len(filtered_results) < 5:
-            filtered_results = results[:5]
+        # Keep at least the top MIN_RESULTS results
+        if len(filtered_results) < settings.MIN_RESULTS:
+            filtered_results = results[:settings.MIN_RESULTS]
         
         logger.info(
             f"Results after filtering: {len(filtered_results)}/{len(results)}"
         )
+        return filtered_results
+
+    def _search_many(self, ctxs: list[QueryContext], n_results: Optional[int],
+                     filters: Optional[dict]) -> list[list[dict]]:
+        """
+        Hybrid search: dense search with adaptive depth, fused with BM25.
         
-        # Build context from retrieved documents
-        context_parts = []
-        for r in filtered_results:
-            if r.get("document"):
-                metadata = r.get("metadata", {})
-                page = metadata.get('page_number', 'N/A')
-                context_parts.append(f"[Page {page}]\n{r['document']}")
+        A small first search (RETRIEVAL_INITIAL_K) answers most questions.
+        It is widened to MAX_RESULTS only when the k neighbours are bunched
+        together (k-th minus best distance under RETRIEVAL_WIDEN_MAX_SPREAD)
+        around a relevant best match: there is no drop-off yet, so more
+        chunks as relevant as these probably lie beyond k. When relevance
+        falls off within the first k, the extra neighbours would be cut by
+        the distance threshold anyway. The top BM25 matches are
+        then merged in by reciprocal rank fusion, so exact tool names are
+        not missed. Dense searches are batched across questions.
         
-        context = "\n\n---\n\n".join(context_parts)
-        logger.info(f"Context length: {len(context)} characters")
+        Only book chunks are searched: predefined questions are filtered
+        out in the index, so they count neither toward adaptive k nor
+        toward the MIN_RESULTS floor.
+        """
+        store = self._current_vector_store()
+        filters = {**(filters or {}), "source": CORPUS_SOURCE}
         
-        # Generate answer using LLM
-        answer = generate_answer(question, context)
-        return answer, cluster_id
\ No newline at end of file
+        def search(batch, k):
+            return store.search_many(
+                [c.question for c in batch], n_results=k,
+                query_embeddings=[c.embedding for c in batch], filters=filters
+            )
+        
+        if n_results is not None or not settings.ADAPTIVE_RETRIEVAL:
+            results = search(ctxs, n_results or settings.MAX_RESULTS)
+        else:
+            k = min(settings.RETRIEVAL_INITIAL_K, settings.MAX_RESULTS)
+            results = search(ctxs, k)
+            widen = [
+                i for i, r in enumerate(results)
+                if len(r) == k and k < settings.MAX_RESULTS
+                and r[0]['distance'] < settings.DISTANCE_THRESHOLD
+                and r[-1]['distance'] - r[0]['distance'] < settings.RETRIEVAL_WIDEN_MAX_SPREAD
+            ]
+            if widen:
+                logger.info(
+                    f"Widening retrieval for {len(widen)}/{len(ctxs)} questions: "
+                    f"k={k} -> {settings.MAX_RESULTS}"
+                )
+                wider = search([ctxs[i] for i in widen], settings.MAX_RESULTS)
+                for i, r in zip(widen, wider):
+                    results[i] = r
+        
+        for r in results:
+            RETRIEVED_DOCUMENTS.observe(len(r))
+        
+        if not settings.HYBRID_RETRIEVAL:
+            return results
+        
+        for i, ctx in enumerate(ctxs):
+            lexical = store.lexical_search(ctx.question, n_results=settings.BM25_RESULTS, filters=filters)
+            if lexical:
+                logger.info(f"BM25 matches: {len(lexical)}")
+                results[i] = reciprocal_rank_fusion(results[i], lexical, k=settings.RRF_K)
+        return results
+
+    @staticmethod
+    def _build_context(results: list[dict]) -> str:
+        """Build the LLM context from retrieved documents (see context_builder)"""
+        with stage("context"):
+            context = build_context(results)
+        tokens = estimate_tokens(context)
+        CONTEXT_TOKENS.observe(tokens)
+        trace = current_trace()
+        if trace is not None:
+            trace.context_tokens = tokens
+        return context
+
+    @staticmethod
+    def _cited_pages(results: list[dict]) -> list:
+        """Distinct page numbers of retrieved documents, in rank order"""
+        pages = []
+        for r in results:
+            page = (r.get("metadata") or {}).get("page_number")
+            if page is not None and page not in pages:
+                pages.append(page)
+        return pages
+
+
+# Shared pipeline instance, set once warm-up completes
+_pipeline: Optional[RAGPipeline] = None
+_startup = {"status": "starting", "timings": {}, "error": None}
+
+
+def get_pipeline() -> Optional[RAGPipeline]:
+    """Get the shared pipeline (None until warm-up completes)"""
+    return _pipeline
+
+
+def startup_status() -> dict:
+    """Warm-up status and per-component timings (seconds)"""
+    return dict(_startup)
+
+
+def init_pipeline() -> RAGPipeline:
+    """
+    Build the shared pipeline, loading heavy components in parallel.
+    
+    The embedding model load, Chroma open and clustering restore run
+    concurrently; per-component timings are logged and kept for /ready.
+    
+    Returns:
+        The shared RAGPipeline
+    """
+    global _pipeline
+    timings = {}
+    
+    def timed(name, factory):
+        start = time.perf_counter()
+        result = factory()
+        timings[name] = round(time.perf_counter() - start, 3)
+        logger.info(f"Startup: {name} ready in {timings[name]:.2f}s")
+        return result
+    
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup") as pool:
+            model = pool.submit(timed, "embedding_model", get_model)
+            vector_store = pool.submit(timed, "vector_store", VectorStore)
+            clustering = pool.submit(timed, "clustering", ClusteringService)
+            model.result()
+            pipeline = RAGPipeline(vector_store=vector_store.result(), clustering=clustering.result())
+    except Exception as e:
+        _startup.update(status="failed", error=str(e), timings=timings)
+        logger.error(f"RAG pipeline startup failed: {e}")
+        raise
+    
+    timings["total"] = round(time.perf_counter() - start, 3)
+    logger.info(f"RAG pipeline warm in {timings['total']:.2f}s ({timings})")
+    
+    _pipeline = pipeline
+    _startup.update(status="ready", timings=timings)
+    return pipeline
@@ -0,0 +1,37 @@
+"""Per-query state shared across pipeline stages"""
+from dataclasses import dataclass
+
+from ..core.tracing import stage
+from ..services.embeddings import embed_text
+
+
+@dataclass
+class QueryContext:
+    """
+    State for a single question flowing through the RAG pipeline.
+
+    The question embedding is computed once and then reused by
+    clustering and vector search.
+
+    Attributes:
+        question: Stripped user question
+        embedding: Question embedding vector
+    """
+    question: str
+    embedding: list[float]
+
+    @classmethod
+    def from_question(cls, question: str) -> "QueryContext":
+        """
+        Build a context by embedding the question once.
+
+        Args:
+            question: User's question
+
+        Returns:
+            QueryContext with the precomputed embedding
+        """
+        question = question.strip()
+        with stage("embedding"):
+            embedding = embed_text(question)
+        return cls(question=question, embedding=embedding)
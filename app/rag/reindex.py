@@ -0,0 +1,167 @@
+"""Background reindexing with zero-downtime collection swap"""
+from datetime import datetime, timezone
+from pathlib import Path
+import fcntl
+import logging
+import threading
+import time
+import uuid
+
+from ..services.vector_store import (
+    DEFAULT_COLLECTION, VectorStore, delete_search_indexes, get_active_collection_name,
+    get_chroma_client, set_active_collection_name
+)
+from ..core.config import settings
+from .pipeline import get_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Lock file next to the Chroma data: one reindex at a time across all workers
+REINDEX_LOCK_FILE = ".reindex.lock"
+
+
+class ReindexInProgressError(Exception):
+    """Raised when a reindex is requested while another one is running"""
+
+
+class ReindexManager:
+    """
+    Runs one reindex job at a time in a background thread.
+
+    The corpus is built into a fresh Chroma collection (reusing the
+    embeddings of unchanged chunks from the live one). The pointer to
+    the served collection is then switched and the pipeline's
+    VectorStore is swapped. Queries already running keep the old
+    VectorStore reference and finish on the old collection, which is
+    kept until the next reindex.
+
+    Jobs are serialized across processes by an exclusive lock on a file
+    in CHROMA_PERSIST_DIR (every uvicorn worker shares that directory),
+    held for the whole job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {"state": "idle"}
+
+    def status(self) -> dict:
+        """Current (or last) job status"""
+        with self._lock:
+            return dict(self._status)
+
+    def start(self) -> dict:
+        """
+        Start a reindex job.
+
+        Returns:
+            Initial job status
+
+        Raises:
+            ReindexInProgressError: If a job is already running (in this or another worker)
+        """
+        with self._lock:
+            if self._status.get("state") == "running":
+                raise ReindexInProgressError(self._status["job_id"])
+            lock_file = self._acquire_process_lock()
+            if lock_file is None:
+                raise ReindexInProgressError("in another worker")
+            self._status = {
+                "state": "running",
+                "job_id": uuid.uuid4().hex[:12],
+                "started_at": datetime.now(timezone.utc).isoformat(),
+            }
+            status = dict(self._status)
+
+        threading.Thread(
+            target=self._run, args=(status["job_id"], lock_file), name="reindex", daemon=True
+        ).start()
+        return status
+
+    @staticmethod
+    def _acquire_process_lock():
+        """
+        Take the cross-process reindex lock without waiting.
+
+        Returns:
+            Open lock file (the lock is released when it is closed), or
+            None if another process holds it
+        """
+        persist_dir = Path(settings.CHROMA_PERSIST_DIR)
+        persist_dir.mkdir(parents=True, exist_ok=True)
+        lock_file = open(persist_dir / REINDEX_LOCK_FILE, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _update(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def _run(self, job_id: str, lock_file):
+        # Imported here: the script module pulls in the PDF loader stack
+        from ..scripts.init_vector_store import build_corpus
+
+        start = time.perf_counter()
+        try:
+            documents, pdf_loaded = build_corpus()
+            if not pdf_loaded:
+                raise FileNotFoundError("PDF not found, refusing to build a questions-only index")
+
+            previous_name = get_active_collection_name()
+            # Unique name: never reuses a collection another worker may still serve
+            new_name = f"{DEFAULT_COLLECTION}_{job_id}"
+            self._update(collection=new_name)
+
+            new_store = VectorStore(collection_name=new_name)
+            summary = new_store.sync_documents(documents, reuse_from=VectorStore(previous_name))
+
+            # Switch the served collection (other workers follow the pointer)
+            set_active_collection_name(new_name)
+            pipeline = get_pipeline()
+            if pipeline is not None:
+                pipeline.swap_vector_store(new_store)
+
+            self._drop_old_collections(keep={new_name, previous_name})
+
+            self._update(
+                state="succeeded",
+                summary=summary,
+                duration_s=round(time.perf_counter() - start, 2),
+                finished_at=datetime.now(timezone.utc).isoformat(),
+            )
+            logger.info(f"Reindex complete: now serving '{new_name}' ({summary})")
+
+        except Exception as e:
+            logger.error(f"Reindex failed: {e}")
+            self._update(
+                state="failed",
+                error=str(e),
+                duration_s=round(time.perf_counter() - start, 2),
+                finished_at=datetime.now(timezone.utc).isoformat(),
+            )
+        finally:
+            lock_file.close()
+
+    @staticmethod
+    def _drop_old_collections(keep: set):
+        """
+        Delete superseded collections, keeping `keep` and the one the pointer names.
+
+        Runs under the cross-process lock, so no other job is building a
+        collection; the pointer is re-read so the served one is never dropped.
+        """
+        keep = keep | {get_active_collection_name()}
+        client = get_chroma_client()
+        for collection in client.list_collections():
+            name = getattr(collection, "name", collection)
+            if name.startswith(DEFAULT_COLLECTION) and name not in keep:
+                client.delete_collection(name)
+                delete_search_indexes(name)
+                logger.info(f"Dropped old collection '{name}'")
+
+
+# Shared manager instance
+reindex_manager = ReindexManager()
@@ -1,24 +1,58 @@
 """Routes d'administration"""
-from fastapi import APIRouter, HTTPException
-from app.scripts.init_vector_store import main as init_vector_store
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.auth.token_auth import get_current_admin, get_token_cache, get_user_status_cache
+from app.core.metrics import all_counters, all_histograms
+from app.db.query_log import query_log_writer
+from app.rag.pipeline import get_pipeline
+from app.rag.reindex import ReindexInProgressError, reindex_manager
+from app.services.embeddings import get_batcher, get_embedding_cache
+from app.services.llm_client import get_llm_client
 import logging
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 logger = logging.getLogger(__name__)
 
-@router.post("/reindex")
-def reindex_vector_store():
-    """Réindexe le vector store (nécessite redémarrage de l'app après)"""
+@router.post("/reindex", status_code=status.HTTP_202_ACCEPTED)
+def reindex_vector_store(admin_id: int = Depends(get_current_admin)):
+    """
+    Lance la réindexation en tâche de fond.
+    
+    L'index est construit dans une nouvelle collection puis servi
+    immédiatement (sans redémarrage). Suivre l'avancement via
+    GET /admin/reindex/status.
+    """
     try:
         logger.info("🔄 Réindexation du vector store...")
-        init_vector_store()
-        return {
-            "status": "success",
-            "message": "Vector store réindexé. Redémarrez l'application pour appliquer les changements."
-        }
-    except Exception as e:
-        logger.error(f"❌ Erreur lors de la réindexation : {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        return reindex_manager.start()
+    except ReindexInProgressError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Réindexation déjà en cours (job {e})"
+        )
+
+@router.get("/reindex/status")
+def reindex_status(admin_id: int = Depends(get_current_admin)):
+    """État de la dernière réindexation"""
+    return reindex_manager.status()
+
+@router.get("/stats")
+def admin_stats(admin_id: int = Depends(get_current_admin)):
+    """Métriques des caches, du batching d'embeddings et histogrammes du pipeline"""
+    stats = {
+        "embedding_batcher": get_batcher().stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "llm": get_llm_client().stats(),
+        "query_log": query_log_writer.stats(),
+        "token_cache": get_token_cache().stats(),
+        "user_status_cache": get_user_status_cache().stats(),
+        "histograms": {name: h.stats() for name, h in all_histograms().items()},
+        "counters": {name: c.stats() for name, c in all_counters().items()},
+    }
+    rag_pipeline = get_pipeline()
+    if rag_pipeline is not None:
+        stats["answer_cache"] = rag_pipeline.answer_cache.stats()
+        stats["clustering"] = rag_pipeline.clustering.stats()
+    return stats
 
 @router.get("/health")
 def admin_health():
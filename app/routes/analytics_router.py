@@ -0,0 +1,65 @@
+"""Routes d'analytique (servies depuis les tables d'agrégats)"""
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.token_auth import get_current_admin
+from app.db.database import get_async_db
+from app.services import analytics
+from app.services.analytics import rollup_scheduler
+
+# Réservé aux administrateurs (toutes les routes)
+router = APIRouter(prefix="/admin/analytics", tags=["Admin"], dependencies=[Depends(get_current_admin)])
+
+@router.get("/latency")
+async def latency(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Latence p50/p95/p99 et volume, global et par cluster, sur les `hours` dernières heures"""
+    return await analytics.latency_summary(db, hours=hours)
+
+@router.get("/volume")
+async def volume(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    cluster: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Nombre de requêtes par heure (tous clusters ou un seul)"""
+    return {
+        "window_hours": hours,
+        "cluster": cluster,
+        "series": await analytics.volume_by_hour(db, hours=hours, cluster=cluster),
+    }
+
+@router.get("/users")
+async def users(
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(20, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Utilisateurs les plus actifs sur les `days` derniers jours"""
+    return {"window_days": days, "users": await analytics.volume_by_user(db, days=days, limit=limit)}
+
+@router.get("/top-questions")
+async def top_questions(
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(20, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Questions les plus fréquentes (casse et espaces ignorés)"""
+    return {"window_days": days, "questions": await analytics.top_questions(db, days=days, limit=limit)}
+
+@router.get("/status")
+def rollup_status():
+    """Dernière mise à jour des agrégats"""
+    return {"last_run": rollup_scheduler.last_run, "last_count": rollup_scheduler.last_count}
+
+@router.post("/refresh")
+async def refresh():
+    """
+    Agrège immédiatement les requêtes en attente.
+
+    Les requêtes plus récentes que ANALYTICS_ROLLUP_LAG_SECONDS restent
+    pour le prochain passage.
+    """
+    return {"aggregated": await rollup_scheduler.run_once()}
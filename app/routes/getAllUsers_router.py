@@ -1,23 +1,79 @@
 """
 Route pour récupérer les utilisateurs
 """
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from ..db.database import get_db
+from ..auth.token_auth import get_current_admin, invalidate_user_status
+from ..core.config import settings
+from ..db.database import AsyncSessionLocal, get_async_db
+from ..db.pagination import InvalidCursorError, fetch_page, iter_rows, page_size
 from ..models.user_model import User
-from ..schemas.user_schema import UserResponse
+from ..schemas.user_schema import UserPage, UserResponse
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-@router.get("/", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db)):
+@router.get("/", response_model=UserPage)
+async def get_all_users(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    admin_id: int = Depends(get_current_admin)
+):
     """
-    Récupère tous les utilisateurs
-    (Sans les mots de passe)
+    Récupère les utilisateurs page par page (sans les mots de passe, administrateurs uniquement)
+    
+    Pagination par curseur sur (created_at, id) : passer le next_cursor
+    de la réponse pour obtenir la page suivante. Le coût d'une page ne
+    dépend pas de sa position dans la table.
     """
-    users = db.query(User).all()
-    return users
\ No newline at end of file
+    try:
+        users, next_cursor = await fetch_page(db, select(User), User, cursor, page_size(limit))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return UserPage(items=users, next_cursor=next_cursor)
+
+
+@router.get("/export")
+async def export_users(admin_id: int = Depends(get_current_admin)):
+    """
+    Exporte tous les utilisateurs en NDJSON (un objet par ligne, administrateurs uniquement)
+    
+    Les lignes sont lues par pages de EXPORT_PAGE_SIZE et envoyées au
+    fil de l'eau : mémoire constante quelle que soit la taille de la table.
+    """
+    async def user_stream():
+        # Session ouverte ici : les dépendances de la requête sont déjà fermées
+        async with AsyncSessionLocal() as db:
+            async for user in iter_rows(db, select(User), User, settings.EXPORT_PAGE_SIZE):
+                yield UserResponse.model_validate(user).model_dump_json() + "\n"
+    
+    return StreamingResponse(user_stream(), media_type="application/x-ndjson")
+
+
+@router.post("/{user_id}/deactivate", response_model=UserResponse)
+async def deactivate_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    admin_id: int = Depends(get_current_admin)
+):
+    """
+    Désactive un compte (administrateurs uniquement)
+    
+    Les tokens déjà émis sont refusés (403) dès la requête suivante sur ce
+    processus : le statut en cache est invalidé ; les autres workers le
+    voient au plus tard après USER_STATUS_CACHE_TTL_SECONDS.
+    """
+    user = await db.scalar(
+        update(User).where(User.id == user_id).values(is_active=False).returning(User)
+    )
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Utilisateur introuvable")
+    await db.commit()
+    invalidate_user_status(user_id)
+    return user
@@ -1,37 +1,66 @@
 """RAG query endpoints"""
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
+from typing import Optional
+import json
+import logging
 import time
 
-from ..db.database import get_db
+from ..db.database import AsyncSessionLocal, get_async_db
+from ..db.pagination import InvalidCursorError, fetch_page, iter_rows, page_size
+from ..db.query_log import query_log_writer
 from ..auth.token_auth import get_current_user
-from ..schemas.query_schema import QueryRequest, QueryResponse
+from ..core.tracing import start_trace
+from ..core.config import settings
+from ..schemas.query_schema import BatchQueryRequest, QueryHistoryPage, QueryRequest, QueryResponse
 from ..models.query_model import Query
-from ..rag.pipeline import RAGPipeline
+from ..rag.pipeline import RAGPipeline, get_pipeline
 
 router = APIRouter(prefix="/query", tags=["RAG Query"])
+logger = logging.getLogger(__name__)
 
-# Singleton pipeline instance
-rag_pipeline = RAGPipeline()
+
+def get_rag_pipeline() -> RAGPipeline:
+    """
+    Shared pipeline dependency.
+    
+    Raises:
+        HTTPException: 503 while the pipeline is still warming up
+    """
+    pipeline = get_pipeline()
+    if pipeline is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RAG pipeline is warming up, retry shortly",
+            headers={"Retry-After": "5"}
+        )
+    return pipeline
 
 
 @router.post("/", response_model=QueryResponse)
-def query_rag(
+async def query_rag(
     request: QueryRequest,
-    db: Session = Depends(get_db),
-    current_user_id: int = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """
     Execute a RAG query.
     
     Retrieves relevant documents and generates an answer
-    using the LLM with retrieved context.
+    using the LLM with retrieved context. Fully async: the
+    LLM call and DB insert do not hold a threadpool worker.
+    With the write-behind query log (QUERY_LOG_ASYNC), the
+    row is queued and the response has no id.
     
     Args:
-        request: Question to answer
+        request: Question to answer, optionally restricted to a document/chapter
         db: Database session
         current_user_id: Authenticated user ID
+        rag_pipeline: Shared RAG pipeline
         
     Returns:
         Query response with answer and metadata
@@ -43,25 +72,272 @@ def query_rag(
         )
     
     start_time = time.time()
+    trace = start_trace()
     
     # Execute RAG pipeline
-    answer, cluster_id = rag_pipeline.query(request.question)
+    answer, cluster_id = await rag_pipeline.aquery(request.question, filters=request.filters())
     
     # Calculate latency
     latency_ms = (time.time() - start_time) * 1000
     
+    row = {
+        "user_id": current_user_id,
+        "question": request.question.strip(),
+        "answer": answer,
+        "cluster": cluster_id,
+        "latency_ms": round(latency_ms, 2),
+        "created_at": datetime.now(timezone.utc),
+        **trace.columns(),
+    }
+    
+    # Write-behind: answer without waiting for the INSERT (no id yet)
+    if query_log_writer.running:
+        await query_log_writer.submit(row)
+        return QueryResponse(**row)
+    
     # Save to database
-    new_query = Query(
-        user_id=current_user_id,
-        question=request.question.strip(),
-        answer=answer,
-        cluster=cluster_id,
-        latency_ms=round(latency_ms, 2),
-        created_at=datetime.now(timezone.utc)
-    )
+    new_query = Query(**row)
     
     db.add(new_query)
-    db.commit()
-    db.refresh(new_query)
+    await db.commit()
+    await db.refresh(new_query)
+    
+    return new_query
+
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def query_rag_stream(
+    request: QueryRequest,
+    current_user_id: int = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """
+    Execute a RAG query and stream the answer over Server-Sent Events.
+    
+    Events:
+        citations: {"cluster", "pages"} as soon as retrieval is done
+        token: answer fragment, as produced by the LLM
+        error: {"detail"} if the LLM stream broke off mid-answer (the
+               partial answer is saved with incomplete=true, not cached)
+        done: {"id", "latency_ms", "time_to_first_token_ms", "complete"}
+              once the Query row has been saved or queued (id is null when queued)
+    
+    Args:
+        request: Question to answer
+        current_user_id: Authenticated user ID
+        rag_pipeline: Shared RAG pipeline
+        
+    Returns:
+        text/event-stream response
+    """
+    if not request.question.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Question cannot be empty"
+        )
+    
+    question = request.question.strip()
+    filters = request.filters()
+    
+    async def event_stream():
+        start_time = time.time()
+        trace = start_trace()
+        first_token_ms = None
+        cluster_id = None
+        parts = []
+        complete = True
+        
+        async for event, data in rag_pipeline.astream(question, filters=filters):
+            if event == "citations":
+                cluster_id = data["cluster"]
+            elif event == "error":
+                complete = False
+            elif event == "token":
+                if first_token_ms is None:
+                    first_token_ms = (time.time() - start_time) * 1000
+                parts.append(data)
+            yield _sse(event, data)
+        
+        latency_ms = (time.time() - start_time) * 1000
+        
+        # Persist the full answer once the stream is complete
+        row = {
+            "user_id": current_user_id,
+            "question": question,
+            "answer": "".join(parts).strip(),
+            "cluster": cluster_id,
+            "latency_ms": round(latency_ms, 2),
+            "time_to_first_token_ms": round(first_token_ms, 2) if first_token_ms is not None else None,
+            "incomplete": not complete,
+            "created_at": datetime.now(timezone.utc),
+            **trace.columns(),
+        }
+        
+        query_id = None
+        if query_log_writer.running:
+            await query_log_writer.submit(row)
+        else:
+            # The session is opened here: request-scoped dependencies are already closed
+            new_query = Query(**row)
+            try:
+                async with AsyncSessionLocal() as db:
+                    db.add(new_query)
+                    await db.commit()
+                query_id = new_query.id
+            except Exception as e:
+                logger.error(f"Failed to save streamed query: {e}")
+        
+        yield _sse("done", {
+            "id": query_id,
+            "latency_ms": row["latency_ms"],
+            "time_to_first_token_ms": row["time_to_first_token_ms"],
+            "complete": complete,
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/batch")
+async def query_rag_batch(
+    request: BatchQueryRequest,
+    current_user_id: int = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """
+    Answer a batch of questions, streamed as newline-delimited JSON.
+    
+    Questions are embedded and searched together; answers are streamed
+    in completion order, one JSON object per line:
+    {"index", "question", "answer", "cluster", "latency_ms"}. All Query
+    rows are handed to the query log in one bulk write once the batch is
+    complete, then a final {"done": true, "logged", "latency_ms"} line
+    is sent.
+    
+    Args:
+        request: Questions (and optional document/chapter filter)
+        current_user_id: Authenticated user ID
+        rag_pipeline: Shared RAG pipeline
+        
+    Returns:
+        application/x-ndjson response
+    """
+    if not request.questions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Questions cannot be empty"
+        )
+    if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_QUESTIONS} questions per batch"
+        )
+    
+    questions = request.questions
+    filters = request.filters()
+    
+    async def result_stream():
+        start_time = time.time()
+        rows = []
+        
+        async for index, answer, cluster_id in rag_pipeline.query_many(questions, filters=filters):
+            latency_ms = round((time.time() - start_time) * 1000, 2)
+            question = questions[index].strip()
+            if question:
+                rows.append({
+                    "user_id": current_user_id,
+                    "question": question,
+                    "answer": answer,
+                    "cluster": cluster_id,
+                    "latency_ms": latency_ms,
+                    "created_at": datetime.now(timezone.utc),
+                })
+            yield json.dumps({
+                "index": index,
+                "question": question,
+                "answer": answer,
+                "cluster": cluster_id,
+                "latency_ms": latency_ms,
+            }, ensure_ascii=False) + "\n"
+        
+        # Bulk write: queued for the write-behind logger, or one multi-row INSERT
+        await query_log_writer.submit_many(rows)
+        
+        yield json.dumps({
+            "done": True,
+            "logged": len(rows),
+            "latency_ms": round((time.time() - start_time) * 1000, 2),
+        }) + "\n"
+    
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/history", response_model=QueryHistoryPage)
+async def query_history(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: int = Depends(get_current_user)
+):
+    """
+    Query history of the current user, newest first.
+    
+    Keyset pagination on (created_at, id): pass the returned next_cursor
+    to get the following page. Each page is an index seek on
+    (user_id, created_at, id), so deep pages cost the same as the first.
+    Queries still in the write-behind log appear once flushed.
+    
+    Args:
+        cursor: next_cursor of the previous page (omit for the first page)
+        limit: Page size (PAGE_SIZE_DEFAULT, at most PAGE_SIZE_MAX)
+        db: Database session
+        current_user_id: Authenticated user ID
+        
+    Returns:
+        Page of queries and the cursor of the next page (null on the last page)
+    """
+    stmt = select(Query).where(Query.user_id == current_user_id)
+    try:
+        queries, next_cursor = await fetch_page(
+            db, stmt, Query, cursor, page_size(limit), descending=True
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return QueryHistoryPage(items=queries, next_cursor=next_cursor)
+
+
+@router.get("/history/export")
+async def export_query_history(current_user_id: int = Depends(get_current_user)):
+    """
+    Full query history of the current user as newline-delimited JSON, newest first.
+    
+    Rows are read EXPORT_PAGE_SIZE at a time and streamed as they are
+    read, so memory stays constant whatever the history size.
+    
+    Args:
+        current_user_id: Authenticated user ID
+        
+    Returns:
+        application/x-ndjson response, one QueryResponse object per line
+    """
+    stmt = select(Query).where(Query.user_id == current_user_id)
+    
+    async def history_stream():
+        # The session is opened here: request-scoped dependencies are already closed
+        async with AsyncSessionLocal() as db:
+            async for query in iter_rows(db, stmt, Query, settings.EXPORT_PAGE_SIZE, descending=True):
+                yield QueryResponse.model_validate(query).model_dump_json() + "\n"
     
-    return new_query
\ No newline at end of file
+    return StreamingResponse(history_stream(), media_type="application/x-ndjson")
@@ -6,20 +6,43 @@ from pydantic import BaseModel, Field, field_serializer
 class QueryRequest(BaseModel):
     """Requête utilisateur"""
     question: str = Field(..., example="What Windows tool records user actions with annotated screenshots?")
+    document: Optional[str] = Field(None, example="windows_10_troubleshooting.pdf")
+    chapter: Optional[str] = Field(None, example="Chapter 18: Troubleshooting Startup")
+    
+    def filters(self) -> dict:
+        """Filtres de métadonnées appliqués à la recherche vectorielle"""
+        return {"document": self.document, "chapter": self.chapter}
+
+
+class BatchQueryRequest(BaseModel):
+    """Lot de questions (évaluation, rejeu hors ligne)"""
+    questions: list[str] = Field(..., example=[
+        "What Windows tool records user actions with annotated screenshots?",
+        "How do I open the Microsoft Management Console?"
+    ])
+    document: Optional[str] = None
+    chapter: Optional[str] = None
+    
+    def filters(self) -> dict:
+        """Filtres de métadonnées communs à toutes les questions"""
+        return {"document": self.document, "chapter": self.chapter}
 
 
 class QueryResponse(BaseModel):
-    """Réponse API"""
-    id: int
+    """Réponse API (id absent quand l'historique est écrit en différé)"""
+    id: Optional[int] = None
     user_id: int
     question: str
     answer: str
     cluster: Optional[str] = None 
     latency_ms: float
+    time_to_first_token_ms: Optional[float] = None
     created_at: datetime
     
-    @field_serializer('latency_ms')
-    def format_latency(self, value: float) -> str:
+    @field_serializer('latency_ms', 'time_to_first_token_ms')
+    def format_latency(self, value: Optional[float]) -> Optional[str]:
+        if value is None:
+            return None
         total_seconds = value / 1000
         minutes = int(total_seconds // 60)
         seconds = total_seconds % 60
@@ -34,4 +57,10 @@ class QueryResponse(BaseModel):
         return value.strftime("%d/%m/%Y %H:%M:%S")
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class QueryHistoryPage(BaseModel):
+    """Page de l'historique (next_cursor absent sur la dernière page)"""
+    items: list[QueryResponse]
+    next_cursor: Optional[str] = None
@@ -2,7 +2,7 @@
 Schemas Pydantic pour les utilisateurs
 """
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 
 
@@ -26,3 +26,7 @@ class UserResponse(UserBase):
         from_attributes = True  # Pour SQLAlchemy models
 
 
+class UserPage(BaseModel):
+    """Page d'utilisateurs (next_cursor absent sur la dernière page)"""
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,118 @@
+"""
+Benchmark: PDF ingestion throughput on a synthetic multi-hundred-page PDF.
+
+Measures the streaming pipeline (page extraction -> chapter detection ->
+splitting) with 1 worker and with all cores, plus peak RSS. With
+--index, chunks are also embedded and upserted into a scratch Chroma
+collection in bounded batches.
+
+Usage:
+    python -m app.scripts.benchmark_ingestion [n_pages] [--index]
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from app.services.document_loader import iter_pdf_chunks
+
+LOREM = (
+    "Remote Desktop and the Microsoft Management Console let you administer PCs "
+    "without visiting users. Problem Steps Recorder captures annotated screenshots. "
+    "Always check the Event Viewer and Reliability History before escalating a fault."
+)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_synthetic_pdf(path: str, n_pages: int, lines_per_page: int = 45):
+    """Write a text-only PDF with n_pages pages (no external dependency)"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+
+    for page in range(n_pages):
+        lines = []
+        if page % 20 == 0:
+            lines.append(f"Chapter {page // 20 + 1}: Synthetic IT Support Topic")
+        while len(lines) < lines_per_page:
+            lines.append(f"{len(lines) + 1}. {LOREM[:95]}")
+
+        text_ops = " T* ".join(f"({_pdf_escape(line)}) Tj" for line in lines)
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td {text_ops} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % n_pages
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                % (len(objects) + 1, xref))
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run(path: str, n_pages: int, workers: int):
+    start = time.perf_counter()
+    n_chunks = sum(1 for _ in iter_pdf_chunks(path, workers=workers))
+    elapsed = time.perf_counter() - start
+    print(f"workers={workers:<3} {n_pages / elapsed:8.1f} pages/s  "
+          f"{n_chunks / elapsed:9.1f} chunks/s  ({n_chunks} chunks, {elapsed:.2f}s, "
+          f"peak RSS {_peak_rss_mb():.0f} MB)")
+
+
+def _run_index(path: str):
+    from app.services.vector_store import VectorStore, delete_search_indexes, get_chroma_client
+
+    name = f"benchmark_ingestion_{os.getpid()}"
+    store = VectorStore(collection_name=name)
+    try:
+        start = time.perf_counter()
+        summary = store.sync_documents(iter_pdf_chunks(path))
+        elapsed = time.perf_counter() - start
+        print(f"index       {summary['added'] / elapsed:9.1f} chunks/s embedded+upserted "
+              f"({elapsed:.2f}s, peak RSS {_peak_rss_mb():.0f} MB)")
+    finally:
+        get_chroma_client().delete_collection(name)
+        delete_search_indexes(name)
+
+
+def main(n_pages: int = 400, index: bool = False):
+    """Generate the synthetic PDF and time each configuration"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        write_synthetic_pdf(path, n_pages)
+        print(f"Synthetic PDF: {n_pages} pages, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        _run(path, n_pages, workers=1)
+        _run(path, n_pages, workers=os.cpu_count() or 1)
+        if index:
+            _run_index(path)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    main(n_pages=int(args[0]) if args else 400, index="--index" in sys.argv)
@@ -0,0 +1,60 @@
+"""Benchmark: per-query CPU time of the retrieval path (embedding + clustering + search)"""
+import time
+
+from app.services.vector_store import VectorStore
+from app.services.clustering import ClusteringService
+from app.services.embeddings import embed_text, get_embedding_cache
+from app.scripts.questions import questions
+
+
+def _sample_questions(limit: int = 50) -> list[str]:
+    """Variants of the reference questions (avoid the exact-match shortcut)"""
+    return [f"{q.rstrip('?')} on Windows?" for q in questions[:limit]]
+
+
+def _run(label, fn, sample):
+    """
+    Time fn over the sample and print per-query CPU and wall time.
+
+    The embedding cache is cleared before every question: otherwise the
+    second embedding of the "before" path, and every question of the
+    second pass, would be cache hits and the comparison meaningless.
+    """
+    cache = get_embedding_cache()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for q in sample:
+        cache.clear()
+        fn(q)
+    cpu_ms = (time.process_time() - cpu_start) * 1000 / len(sample)
+    wall_ms = (time.perf_counter() - wall_start) * 1000 / len(sample)
+    print(f"{label:<28} cpu={cpu_ms:7.2f} ms/query  wall={wall_ms:7.2f} ms/query")
+    return cpu_ms
+
+
+def main(n_results: int = 30):
+    """Compare the double-embedding path with the shared-embedding path"""
+    vector_store = VectorStore()
+    clustering = ClusteringService()
+    sample = _sample_questions()
+
+    def before(q):
+        clustering.assign_cluster(q)
+        vector_store.search(q, n_results=n_results)
+
+    def after(q):
+        embedding = embed_text(q)
+        clustering.assign_cluster(q, embedding=embedding)
+        vector_store.search(q, n_results=n_results, query_embedding=embedding)
+
+    # Warm-up (model load, Chroma caches)
+    after(sample[0])
+
+    print(f"Benchmarking {len(sample)} questions (n_results={n_results})")
+    cpu_before = _run("before (2 embeddings)", before, sample)
+    cpu_after = _run("after (1 shared embedding)", after, sample)
+    print(f"CPU time saved per query: {cpu_before - cpu_after:.2f} ms "
+          f"({(1 - cpu_after / cpu_before) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: Chroma (HNSW) vs flat NumPy index, top-k latency by corpus size.
+
+Random unit vectors stand in for chunk embeddings (384 dimensions, as
+BAAI/bge-small-en-v1.5), so the script needs neither the PDF nor the
+embedding model. For each size it reports per-query latency of Chroma,
+of the flat index (float32 and float16, single and batched queries),
+and the recall of Chroma's approximate top-k against the exact one.
+
+Usage:
+    python -m app.scripts.benchmark_vector_backends [sizes...] [--k=8]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services.flat_index import FlatIndex
+from app.services.vector_store import WRITE_BATCH_SIZE, get_chroma_client
+
+DIM = 384
+N_QUERIES = 200
+BATCH_SIZE = 32
+
+
+def _unit(rng, n: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _ms_per_query(fn, queries, batch: int = 1) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        fn(queries[i:i + batch])
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def _bench_size(n: int, k: int, rng):
+    ids = [f"chunk_{i}" for i in range(n)]
+    embeddings = _unit(rng, n)
+    documents = [f"Synthetic chunk {i}" for i in range(n)]
+    metadatas = [{"page_number": i // 10 + 1, "source": "PDF"} for i in range(n)]
+    # Queries close to stored vectors, as real questions are close to their answer
+    queries = _unit(rng, N_QUERIES) * 0.3 + embeddings[rng.integers(0, n, N_QUERIES)]
+
+    client = get_chroma_client()
+    name = f"benchmark_backends_{os.getpid()}_{n}"
+    collection = client.create_collection(name)
+    try:
+        start = time.perf_counter()
+        for i in range(0, n, WRITE_BATCH_SIZE):
+            collection.add(
+                ids=ids[i:i + WRITE_BATCH_SIZE],
+                embeddings=embeddings[i:i + WRITE_BATCH_SIZE].tolist(),
+                documents=documents[i:i + WRITE_BATCH_SIZE],
+                metadatas=metadatas[i:i + WRITE_BATCH_SIZE],
+            )
+        print(f"\n{n} chunks (Chroma load {time.perf_counter() - start:.1f}s)")
+
+        def chroma(batch):
+            return collection.query(query_embeddings=batch.tolist(), n_results=k)
+
+        chroma(queries[:1])
+        chroma_hits = [set(r) for r in chroma(queries)["ids"]]
+        print(f"  chroma              {_ms_per_query(chroma, queries):8.3f} ms/query")
+        print(f"  chroma batch={BATCH_SIZE:<7}{_ms_per_query(chroma, queries, BATCH_SIZE):8.3f} ms/query")
+    finally:
+        client.delete_collection(name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in ("float32", "float16"):
+            directory = Path(tmp) / dtype
+            FlatIndex.build(ids, embeddings, documents, metadatas, dtype=dtype).save(directory)
+            index = FlatIndex.load(directory)
+
+            def flat(batch):
+                return index.search_many(batch, n_results=k)
+
+            flat(queries[:1])
+            exact = [{r["id"] for r in rows} for rows in flat(queries)]
+            recall = np.mean([len(c & e) / k for c, e in zip(chroma_hits, exact)])
+            size_mb = index.matrix.nbytes / 1e6
+            print(f"  flat {dtype:<8}       {_ms_per_query(flat, queries):8.3f} ms/query  "
+                  f"({size_mb:.0f} MB mmap, Chroma recall@{k} {recall:.3f})")
+            print(f"  flat {dtype} batch={BATCH_SIZE:<2}{_ms_per_query(flat, queries, BATCH_SIZE):8.3f} ms/query")
+
+
+def main(sizes=(1_000, 10_000, 100_000), k: int = 8):
+    """Run the comparison for each corpus size"""
+    rng = np.random.default_rng(42)
+    print(f"dim={DIM}, k={k}, {N_QUERIES} queries per size")
+    for n in sizes:
+        _bench_size(n, k, rng)
+
+
+if __name__ == "__main__":
+    k_arg = [a for a in sys.argv[1:] if a.startswith("--k=")]
+    sizes = [int(a) for a in sys.argv[1:] if not a.startswith("--")]
+    main(sizes=sizes or (1_000, 10_000, 100_000), k=int(k_arg[0][4:]) if k_arg else 8)
@@ -1,7 +1,10 @@
 """Vector store initialization script"""
+from itertools import chain
+from typing import Iterable
+
 from app.services.vector_store import VectorStore
 from app.scripts.questions import questions_data
-from app.services.document_loader import load_and_split_pdf
+from app.services.document_loader import iter_corpus_chunks
 
 
 class DummyDoc:
@@ -11,40 +14,57 @@ class DummyDoc:
         self.metadata = metadata or {}
 
 
-def main():
-    """Initialize vector store with questions and PDF chunks"""
-    print("Initializing vector store...")
+def build_corpus() -> tuple[Iterable, bool]:
+    """
+    Collect predefined questions and PDF chunks.
 
-    vector_store = VectorStore()
-    documents_to_index = []
+    The PDF part is a lazy stream (parallel extraction + splitting),
+    consumed batch by batch by the vector store.
 
+    Returns:
+        Tuple of (documents, pdf_loaded)
+    """
     # Add predefined questions
     print(f"Adding {len(questions_data)} questions...")
-    for q in questions_data:
-        documents_to_index.append(DummyDoc(
-            q["question"], 
-            {"category": q["category"], "source": "predefined"}
-        ))
+    questions_docs = [
+        DummyDoc(q["question"], {"category": q["category"], "source": "predefined"})
+        for q in questions_data
+    ]
 
-    # Add PDF chunks
+    # Add PDF chunks (every manual of PDF_DIR, or PDF_PATH)
     print("Loading PDF...")
     try:
-        pdf_chunks = load_and_split_pdf()
-        documents_to_index.extend(pdf_chunks)
-        print(f"Added {len(pdf_chunks)} PDF chunks")
+        pdf_chunks = iter_corpus_chunks()
     except FileNotFoundError as e:
         print(f"Warning: {e}")
         print("Indexing questions only")
+        return questions_docs, False
+
+    return chain(questions_docs, pdf_chunks), True
 
-    if not documents_to_index:
-        print("Error: No documents to index")
-        return
 
-    # Index documents
-    print(f"Indexing {len(documents_to_index)} documents...")
-    vector_store.add_documents(documents_to_index)
+def main():
+    """Initialize vector store with questions and PDF chunks"""
+    print("Initializing vector store...")
+
+    vector_store = VectorStore()
+    documents_to_index, pdf_loaded = build_corpus()
 
-    print(f"Successfully indexed {len(documents_to_index)} documents")
+    # Index documents (only new/changed chunks are embedded)
+    print("Indexing documents...")
+    if pdf_loaded:
+        # Full corpus: chunks no longer present are removed
+        summary = vector_store.sync_documents(documents_to_index)
+        total = summary['added'] + summary['unchanged']
+        print(
+            f"Successfully indexed {total} documents "
+            f"(added: {summary['added']}, deleted: {summary['deleted']}, "
+            f"unchanged: {summary['unchanged']}, metadata updated: {summary['updated']})"
+        )
+    else:
+        # Partial corpus: never delete the existing PDF chunks
+        vector_store.add_documents(documents_to_index)
+        print(f"Successfully indexed {len(documents_to_index)} documents")
     
     # Quick test
     print("\nRunning search test...")
@@ -54,4 +74,4 @@ def main():
 
 
 # if __name__ == "__main__":
-#     main()
\ No newline at end of file
+#     main()
@@ -0,0 +1,84 @@
+"""
+Load test: sync (threadpool) vs async query path against a fake LLM.
+
+The Gemini call is replaced by a local fake that waits FAKE_LLM_LATENCY
+seconds, so the test measures how many questions can be in flight at
+once rather than Gemini throughput.
+
+Usage:
+    python -m app.scripts.load_test_query [concurrency] [llm_latency_s]
+"""
+import asyncio
+import sys
+import time
+
+import anyio
+
+from app.core.config import settings
+from app.rag import pipeline as pipeline_module
+from app.rag.pipeline import RAGPipeline
+from app.scripts.questions import questions
+
+FAKE_LLM_LATENCY = 2.0
+
+
+def _fake_generate_answer(question: str, context: str) -> str:
+    time.sleep(FAKE_LLM_LATENCY)
+    return f"Fake answer for: {question}"
+
+
+async def _fake_generate_answer_async(question: str, context: str) -> str:
+    await asyncio.sleep(FAKE_LLM_LATENCY)
+    return f"Fake answer for: {question}"
+
+
+def _questions(n: int) -> list[str]:
+    """n distinct questions (the answer cache is disabled anyway)"""
+    return [f"{questions[i % len(questions)]} (#{i})" for i in range(n)]
+
+
+async def _run_sync(pipeline: RAGPipeline, sample: list[str]) -> float:
+    """Sync query() in Starlette's threadpool (40 threads), as a `def` route would run"""
+    start = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for q in sample:
+            tg.start_soon(anyio.to_thread.run_sync, pipeline.query, q)
+    return time.perf_counter() - start
+
+
+async def _run_async(pipeline: RAGPipeline, sample: list[str]) -> float:
+    """aquery() awaited directly on the event loop, as the async route runs"""
+    start = time.perf_counter()
+    await asyncio.gather(*(pipeline.aquery(q) for q in sample))
+    return time.perf_counter() - start
+
+
+def _report(label: str, n: int, elapsed: float):
+    print(f"{label:<8} {n} questions in {elapsed:6.2f}s  "
+          f"-> {n / elapsed:6.1f} q/s, effective concurrency {n * FAKE_LLM_LATENCY / elapsed:5.1f}")
+
+
+def main(concurrency: int = 200, llm_latency: float = FAKE_LLM_LATENCY):
+    """Run both paths with the same number of concurrent questions"""
+    global FAKE_LLM_LATENCY
+    FAKE_LLM_LATENCY = llm_latency
+
+    settings.ANSWER_CACHE_ENABLED = False
+    pipeline_module.generate_answer = _fake_generate_answer
+    pipeline_module.generate_answer_async = _fake_generate_answer_async
+
+    pipeline = RAGPipeline()
+    sample = _questions(concurrency)
+    pipeline.query(sample[0])  # warm-up
+
+    print(f"Concurrency: {concurrency}, fake LLM latency: {FAKE_LLM_LATENCY}s")
+    _report("sync", concurrency, anyio.run(_run_sync, pipeline, sample))
+    _report("async", concurrency, asyncio.run(_run_async(pipeline, sample)))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        concurrency=int(args[0]) if args else 200,
+        llm_latency=float(args[1]) if len(args) > 1 else FAKE_LLM_LATENCY
+    )
@@ -0,0 +1,38 @@
+"""
+Grant or revoke admin rights (users.is_admin).
+
+Running workers pick the change up within USER_STATUS_CACHE_TTL_SECONDS.
+
+Usage:
+    python -m app.scripts.set_admin <email> [--revoke]
+"""
+import sys
+
+from sqlalchemy import update
+
+from app.db.database import SessionLocal
+from app.models.user_model import User
+
+
+def set_admin(email: str, is_admin: bool = True) -> bool:
+    """
+    Set the admin flag of the account with this email.
+
+    Returns:
+        False if no account has this email
+    """
+    with SessionLocal() as db:
+        user_id = db.scalar(
+            update(User).where(User.email == email).values(is_admin=is_admin).returning(User.id)
+        )
+        db.commit()
+    return user_id is not None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    email, revoke = sys.argv[1], "--revoke" in sys.argv[2:]
+    if not set_admin(email, is_admin=not revoke):
+        sys.exit(f"No user with email {email}")
+    print(f"{email}: admin {'revoked' if revoke else 'granted'}")
@@ -0,0 +1,299 @@
+"""Query analytics: incremental hourly rollups and dashboard queries"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..db.database import AsyncSessionLocal
+from ..models import analytics_model  # noqa: F401  (registers the rollup tables)
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds (ms); an extra last bucket counts slower queries
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2000, 3000, 5000, 8000, 13000, 20000, 30000, 60000)
+
+ROLLUP_NAME = "queries"
+
+# Serializes rollups across workers (pg_try_advisory_xact_lock key)
+ROLLUP_LOCK_KEY = 7_214_001
+
+
+def _bucket_counts_sql() -> str:
+    """ARRAY[count per latency bucket] expression for the rollup SELECT"""
+    filters, lower = [], None
+    for bound in LATENCY_BUCKETS_MS:
+        condition = f"latency_ms <= {bound}" if lower is None else f"latency_ms > {lower} AND latency_ms <= {bound}"
+        filters.append(f"count(*) FILTER (WHERE {condition})")
+        lower = bound
+    filters.append(f"count(*) FILTER (WHERE latency_ms > {lower})")
+    return "ARRAY[" + ", ".join(filters) + "]::bigint[]"
+
+
+_ROLLUP_HOURLY = text(f"""
+    INSERT INTO query_stats_hourly AS t (hour, cluster, query_count, latency_sum_ms, latency_buckets)
+    SELECT date_trunc('hour', created_at), COALESCE(cluster, 'Uncategorized'),
+           count(*), COALESCE(sum(latency_ms), 0), {_bucket_counts_sql()}
+    FROM queries
+    WHERE id > :after_id AND id <= :until_id
+    GROUP BY 1, 2
+    ON CONFLICT (hour, cluster) DO UPDATE SET
+        query_count = t.query_count + EXCLUDED.query_count,
+        latency_sum_ms = t.latency_sum_ms + EXCLUDED.latency_sum_ms,
+        latency_buckets = ARRAY(
+            SELECT a + b
+            FROM unnest(t.latency_buckets, EXCLUDED.latency_buckets) WITH ORDINALITY AS u(a, b, i)
+            ORDER BY i
+        )
+""")
+
+_ROLLUP_USERS = text("""
+    INSERT INTO user_query_stats_daily AS t (day, user_id, query_count, latency_sum_ms)
+    SELECT (created_at AT TIME ZONE 'UTC')::date, user_id, count(*), COALESCE(sum(latency_ms), 0)
+    FROM queries
+    WHERE id > :after_id AND id <= :until_id
+    GROUP BY 1, 2
+    ON CONFLICT (day, user_id) DO UPDATE SET
+        query_count = t.query_count + EXCLUDED.query_count,
+        latency_sum_ms = t.latency_sum_ms + EXCLUDED.latency_sum_ms
+""")
+
+_ROLLUP_QUESTIONS = text("""
+    INSERT INTO question_stats_daily AS t (day, question_hash, question, query_count)
+    SELECT (created_at AT TIME ZONE 'UTC')::date, md5(lower(btrim(question))), min(question), count(*)
+    FROM queries
+    WHERE id > :after_id AND id <= :until_id
+    GROUP BY 1, 2
+    ON CONFLICT (day, question_hash) DO UPDATE SET
+        query_count = t.query_count + EXCLUDED.query_count
+""")
+
+# Next ids to aggregate: up to :chunk rows after the watermark, stopping
+# before the first row inserted less than :lag ago (it may precede ids of
+# still uncommitted inserts). inserted_at is set by Postgres at insert time;
+# created_at is the request time and can be much older for queued rows.
+_NEXT_CHUNK = text("""
+    WITH pending AS (
+        SELECT id, COALESCE(inserted_at >= now() - make_interval(secs => :lag), false) AS recent
+        FROM queries
+        WHERE id > :after_id
+        ORDER BY id
+        LIMIT :chunk
+    )
+    SELECT max(id), count(*)
+    FROM pending
+    WHERE id < COALESCE((SELECT min(id) FROM pending WHERE recent), 2147483647)
+""")
+
+
+async def refresh_rollups(db: AsyncSession) -> int:
+    """
+    Fold queries logged since the last run into the rollup tables.
+
+    Rows are processed in id order, ANALYTICS_ROLLUP_CHUNK rows per
+    transaction, each committed together with the new watermark. Aggregation
+    stops at the first row inserted less than ANALYTICS_ROLLUP_LAG_SECONDS
+    ago (server-side inserted_at, not the request-time created_at), so ids
+    of concurrent inserts that commit late are not skipped. The lag must
+    exceed the longest insert transaction. Only one worker rolls up at a time.
+
+    Args:
+        db: Async session
+
+    Returns:
+        Number of queries aggregated
+    """
+    total = 0
+    while True:
+        locked = await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ROLLUP_LOCK_KEY})
+        if not locked:
+            await db.rollback()
+            return total
+
+        await db.execute(
+            text("INSERT INTO analytics_rollup_state (name, last_query_id) VALUES (:name, 0) "
+                 "ON CONFLICT (name) DO NOTHING"),
+            {"name": ROLLUP_NAME}
+        )
+        after_id = await db.scalar(
+            text("SELECT last_query_id FROM analytics_rollup_state WHERE name = :name FOR UPDATE"),
+            {"name": ROLLUP_NAME}
+        )
+        until_id, count = (await db.execute(_NEXT_CHUNK, {
+            "after_id": after_id,
+            "chunk": settings.ANALYTICS_ROLLUP_CHUNK,
+            "lag": settings.ANALYTICS_ROLLUP_LAG_SECONDS,
+        })).one()
+        if until_id is None:
+            await db.commit()
+            return total
+
+        params = {"after_id": after_id, "until_id": until_id}
+        for statement in (_ROLLUP_HOURLY, _ROLLUP_USERS, _ROLLUP_QUESTIONS):
+            await db.execute(statement, params)
+        await db.execute(
+            text("UPDATE analytics_rollup_state SET last_query_id = :until_id WHERE name = :name"),
+            {"until_id": until_id, "name": ROLLUP_NAME}
+        )
+        await db.commit()
+        total += count
+
+
+def _percentile(buckets: list[int], q: float) -> Optional[float]:
+    """Upper bound (ms) of the bucket holding the q-th query, clamped to the largest bound"""
+    total = sum(buckets)
+    if not total:
+        return None
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS, buckets):
+        seen += count
+        if seen >= q * total:
+            return float(bound)
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+def _since(hours: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=hours)
+
+
+async def latency_summary(db: AsyncSession, hours: int = 24) -> dict:
+    """
+    Latency percentiles and volume, overall and per cluster.
+
+    Args:
+        db: Async session
+        hours: Window (hours back from now)
+
+    Returns:
+        Dict with "overall" and "clusters" entries (count, mean, p50, p95, p99)
+    """
+    rows = await db.execute(text("""
+        SELECT h.cluster, u.i, sum(u.n)
+        FROM query_stats_hourly h,
+             unnest(h.latency_buckets) WITH ORDINALITY AS u(n, i)
+        WHERE h.hour >= :since
+        GROUP BY h.cluster, u.i
+    """), {"since": _since(hours)})
+    totals = await db.execute(text("""
+        SELECT cluster, sum(query_count), sum(latency_sum_ms)
+        FROM query_stats_hourly
+        WHERE hour >= :since
+        GROUP BY cluster
+    """), {"since": _since(hours)})
+
+    n_buckets = len(LATENCY_BUCKETS_MS) + 1
+    buckets = {}
+    for cluster, index, count in rows:
+        buckets.setdefault(cluster, [0] * n_buckets)[index - 1] = int(count)
+
+    def summary(counts: list[int], count: int, latency_sum: float) -> dict:
+        return {
+            "count": count,
+            "mean_ms": round(latency_sum / count, 2) if count else None,
+            "p50_ms": _percentile(counts, 0.50),
+            "p95_ms": _percentile(counts, 0.95),
+            "p99_ms": _percentile(counts, 0.99),
+        }
+
+    clusters, overall, overall_count, overall_sum = {}, [0] * n_buckets, 0, 0.0
+    for cluster, count, latency_sum in totals:
+        counts = buckets.get(cluster, [0] * n_buckets)
+        clusters[cluster] = summary(counts, int(count), float(latency_sum))
+        overall = [a + b for a, b in zip(overall, counts)]
+        overall_count += int(count)
+        overall_sum += float(latency_sum)
+
+    return {
+        "window_hours": hours,
+        "overall": summary(overall, overall_count, overall_sum),
+        "clusters": clusters,
+    }
+
+
+async def volume_by_hour(db: AsyncSession, hours: int = 24, cluster: Optional[str] = None) -> list[dict]:
+    """Query count per hour (optionally for one cluster), oldest first"""
+    result = await db.execute(text("""
+        SELECT hour, sum(query_count)
+        FROM query_stats_hourly
+        WHERE hour >= :since AND (CAST(:cluster AS varchar) IS NULL OR cluster = :cluster)
+        GROUP BY hour
+        ORDER BY hour
+    """), {"since": _since(hours), "cluster": cluster})
+    return [{"hour": hour.isoformat(), "count": int(count)} for hour, count in result]
+
+
+async def volume_by_user(db: AsyncSession, days: int = 7, limit: int = 20) -> list[dict]:
+    """Most active users over the window"""
+    result = await db.execute(text("""
+        SELECT user_id, sum(query_count) AS n, sum(latency_sum_ms)
+        FROM user_query_stats_daily
+        WHERE day >= :since
+        GROUP BY user_id
+        ORDER BY n DESC
+        LIMIT :limit
+    """), {"since": _since(days * 24).date(), "limit": limit})
+    return [
+        {"user_id": user_id, "count": int(n), "mean_ms": round(float(total) / n, 2) if n else None}
+        for user_id, n, total in result
+    ]
+
+
+async def top_questions(db: AsyncSession, days: int = 7, limit: int = 20) -> list[dict]:
+    """Most frequent questions (case/whitespace-insensitive) over the window"""
+    result = await db.execute(text("""
+        SELECT min(question), sum(query_count) AS n
+        FROM question_stats_daily
+        WHERE day >= :since
+        GROUP BY question_hash
+        ORDER BY n DESC
+        LIMIT :limit
+    """), {"since": _since(days * 24).date(), "limit": limit})
+    return [{"question": question, "count": int(n)} for question, n in result]
+
+
+class RollupScheduler:
+    """Runs refresh_rollups every ANALYTICS_ROLLUP_INTERVAL_SECONDS in the background"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[str] = None
+        self.last_count = 0
+
+    def start(self):
+        """Start the periodic task (call from the running event loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="analytics-rollup")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        """Roll up pending queries now"""
+        async with AsyncSessionLocal() as db:
+            count = await refresh_rollups(db)
+        self.last_run = datetime.now(timezone.utc).isoformat()
+        self.last_count = count
+        if count:
+            logger.info(f"Analytics rollup: {count} queries aggregated")
+        return count
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Analytics rollup failed: {e}")
+            await asyncio.sleep(settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS)
+
+
+# Shared scheduler instance (started in the app lifespan)
+rollup_scheduler = RollupScheduler()
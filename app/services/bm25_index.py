@@ -0,0 +1,188 @@
+"""In-process BM25 inverted index for lexical retrieval"""
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional
+import json
+import logging
+import math
+import os
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Question words carry no lexical signal and would match most chunks
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it its me my of on or
+should the this to what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase alphanumeric tokens, stopwords removed (no stemming: tool names stay exact)"""
+    return [t for t in _TOKEN.findall(text.casefold()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Immutable BM25 index over a collection snapshot.
+
+    The BM25 weight of every (term, document) pair is computed at build
+    time, so a query only sums precomputed weights over the postings of
+    its terms and takes the top-k with argpartition. Postings are stored
+    as flat arrays (CSR layout: term offsets, document indices, weights).
+    """
+
+    def __init__(self, ids: list, documents: list, metadatas: list,
+                 terms: list, offsets: np.ndarray, postings: np.ndarray, weights: np.ndarray):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids: Iterable[str], documents: Iterable[str],
+              metadatas: Iterable[Optional[dict]]) -> "BM25Index":
+        """
+        Build the index from documents.
+
+        Args:
+            ids: Document IDs
+            documents: Document texts
+            metadatas: Document metadata (used for filtered search)
+
+        Returns:
+            BM25Index
+        """
+        ids, documents = list(ids), list(documents)
+        metadatas = [m or {} for m in metadatas]
+
+        term_postings = {}
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for index, text in enumerate(documents):
+            tokens = tokenize(text or "")
+            lengths[index] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_postings.setdefault(term, []).append((index, tf))
+
+        n_docs = len(documents)
+        avg_length = float(lengths.mean()) if n_docs else 0.0
+        terms = sorted(term_postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        postings, weights = [], []
+
+        for i, term in enumerate(terms):
+            entries = term_postings[term]
+            idf = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            doc_indices = np.fromiter((d for d, _ in entries), dtype=np.int32, count=len(entries))
+            tf = np.fromiter((f for _, f in entries), dtype=np.float32, count=len(entries))
+            norm = K1 * (1 - B + B * lengths[doc_indices] / (avg_length or 1.0))
+            postings.append(doc_indices)
+            weights.append((idf * tf * (K1 + 1) / (tf + norm)).astype(np.float32))
+            offsets[i + 1] = offsets[i] + len(entries)
+
+        return cls(
+            ids, documents, metadatas, terms, offsets,
+            np.concatenate(postings) if postings else np.zeros(0, dtype=np.int32),
+            np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32),
+        )
+
+    def search(self, query: str, n_results: int = 10,
+               filters: Optional[dict] = None) -> list[dict]:
+        """
+        Rank documents by BM25 score.
+
+        Args:
+            query: Query text
+            n_results: Maximum number of results
+            filters: Exact-match metadata filters (None values ignored)
+
+        Returns:
+            Results shaped like VectorStore.search (distance is None,
+            `bm25_score` holds the score), best first
+        """
+        term_ids = {self.terms[t] for t in tokenize(query) if t in self.terms}
+        if not term_ids or n_results <= 0:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for t in term_ids:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            scores[self.postings[start:end]] += self.weights[start:end]
+
+        candidates = np.flatnonzero(scores)
+        conditions = {k: v for k, v in (filters or {}).items() if v is not None}
+        if not conditions and len(candidates) > n_results:
+            candidates = candidates[np.argpartition(-scores[candidates], n_results)[:n_results]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        results = []
+        for index in ranked:
+            metadata = self.metadatas[index]
+            if any(metadata.get(k) != v for k, v in conditions.items()):
+                continue
+            results.append({
+                "id": self.ids[index],
+                "document": self.documents[index],
+                "metadata": metadata,
+                "distance": None,
+                "bm25_score": float(scores[index]),
+            })
+            if len(results) >= n_results:
+                break
+        return results
+
+    def save(self, path: Path):
+        """Write the index atomically to a single .npz file"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+            "terms": sorted(self.terms, key=self.terms.get),
+        }
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp,
+            meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+            offsets=self.offsets,
+            postings=self.postings,
+            weights=self.weights,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BM25Index"]:
+        """
+        Read an index written by save().
+
+        Returns:
+            BM25Index, or None if the file is missing or from another format version
+        """
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            if meta.get("format_version") != INDEX_FORMAT_VERSION:
+                logger.warning(f"Ignoring BM25 index with format {meta.get('format_version')}: {path}")
+                return None
+            return cls(
+                meta["ids"], meta["documents"], meta["metadatas"], meta["terms"],
+                data["offsets"], data["postings"], data["weights"],
+            )
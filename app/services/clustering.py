@@ -1,13 +1,37 @@
 """Question clustering service"""
 from sklearn.cluster import MiniBatchKMeans
+import joblib
+import sklearn
+from pathlib import Path
+from typing import NamedTuple, Optional
 import numpy as np
+import hashlib
+import json
 import logging
+import os
+import queue
+import threading
+import time
 
-from .embeddings import embed_text, embed_texts
+from .embeddings import embed_text, embed_texts, warm_embedding_cache
+from ..core.config import settings
+from ..core.tracing import traced
 from ..scripts.questions import questions, questions_data
 
 logger = logging.getLogger(__name__)
 
+# Bump when the artifact layout changes
+ARTIFACT_FORMAT_VERSION = 2
+
+
+class ClusterSnapshot(NamedTuple):
+    """Immutable view of the fitted model used for prediction"""
+    centroids: np.ndarray
+    centroid_sq_norms: np.ndarray
+    reference_clusters: np.ndarray
+    cluster_categories: list[str]
+    cluster_confidence: np.ndarray
+
 
 class ClusteringService:
     """
@@ -15,6 +39,14 @@ class ClusteringService:
     
     Automatically assigns questions to predefined categories
     based on semantic similarity.
+    
+    Prediction is read-only and lock-free: it uses the current centroid
+    snapshot. Incoming embeddings are queued for a background thread,
+    which runs `partial_fit` in batches and swaps in a new snapshot.
+    
+    With CLUSTERING_METHOD="nearest", the category of the most similar
+    reference question is used instead of KMeans (one matrix-vector
+    product, no model updates).
     """
     
     def __init__(self, n_clusters: int = 5):
@@ -26,38 +58,203 @@ class ClusteringService:
         """
         self.n_clusters = n_clusters
         self.kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42)
+        self.method = settings.CLUSTERING_METHOD
+        self._snapshot = None
         
         # Map questions to categories
         self.question_to_category = {
             q["question"]: q["category"] for q in questions_data
         }
         
+        # Online updates (consumed by the background updater only)
+        self._updates = queue.Queue(maxsize=settings.CLUSTER_UPDATE_BATCH_SIZE * 16)
+        self._updater = None
+        
         self._initialize()
+        
+        if (settings.CLUSTER_ONLINE_UPDATES and self.method == "kmeans"
+                and self._snapshot is not None):
+            self._updater = threading.Thread(
+                target=self._run_updates, name="cluster-updater", daemon=True
+            )
+            self._updater.start()
     
     def _initialize(self):
-        """Train clustering model on reference questions"""
+        """Restore the fitted model from disk, or train it on reference questions"""
         if not questions:
             logger.warning("No reference questions available")
             return
         
-        # Generate embeddings
-        embeddings = np.array(embed_texts(questions))
+        start = time.perf_counter()
+        artifact = self._load_artifact()
         
-        # Train model
-        self.kmeans.fit(embeddings)
+        if artifact is not None:
+            # The fitted estimator keeps its per-cluster counts and step
+            # count, so online updates continue at the trained learning rate
+            self.kmeans, embeddings = artifact
+            source = "restored from artifact"
+        else:
+            # Generate embeddings
+            embeddings = np.array(embed_texts(questions), dtype=np.float32)
+            
+            # Train model
+            self.kmeans.fit(embeddings)
+            self._save_artifact(self.kmeans, embeddings)
+            source = "trained"
+        centroids = self.kmeans.cluster_centers_
+        
+        # Repeated predefined questions skip the model entirely
+        warm_embedding_cache(questions, embeddings)
         
-        # Cache predictions
         self._reference_embeddings = embeddings
-        self._reference_clusters = self.kmeans.predict(embeddings)
+        self._reference_categories = self._categories_for_questions()
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self._reference_unit = embeddings / np.where(norms == 0, 1, norms)
+        self._publish_snapshot(centroids)
         
-        logger.info(f"Clustering initialized with {len(questions)} questions")
+        logger.info(
+            f"Clustering initialized with {len(questions)} questions "
+            f"({source} in {time.perf_counter() - start:.2f}s)"
+        )
     
-    def assign_cluster(self, question: str) -> str:
+    def _artifact_key(self) -> str:
+        """Version key: embedding model, cluster count, question set and scikit-learn version"""
+        payload = json.dumps({
+            "format": ARTIFACT_FORMAT_VERSION,
+            "sklearn": sklearn.__version__,
+            "model": settings.EMBEDDING_MODEL,
+            "n_clusters": self.n_clusters,
+            "questions": questions_data,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _load_artifact(self) -> Optional[tuple[MiniBatchKMeans, np.ndarray]]:
+        """
+        Load the fitted model and reference embeddings if the artifact is current.
+        
+        Returns:
+            Tuple of (fitted MiniBatchKMeans, memory-mapped reference
+            embeddings), or None if missing, stale or unreadable
+        """
+        directory = Path(settings.CLUSTERING_ARTIFACT_DIR)
+        meta_path = directory / "meta.json"
+        if not meta_path.exists():
+            return None
+        
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("key") != self._artifact_key():
+                logger.info("Clustering artifact is stale (model or questions changed)")
+                return None
+            
+            kmeans = joblib.load(directory / "kmeans.joblib")
+            embeddings = np.load(directory / "reference_embeddings.npy", mmap_mode="r")
+            if (embeddings.shape[0] != len(questions)
+                    or kmeans.cluster_centers_.shape[0] != self.n_clusters):
+                return None
+            return kmeans, embeddings
+        except Exception as e:
+            logger.warning(f"Could not load clustering artifact: {e}")
+            return None
+    
+    def _save_artifact(self, kmeans: MiniBatchKMeans, embeddings: np.ndarray):
+        """
+        Persist the fitted model (meta.json is written last and marks completion).
+        
+        The whole estimator is saved, not only its centroids: partial_fit
+        weights each update by the per-cluster counts, and a model rebuilt
+        from centroids alone would be dragged toward its first mini-batch.
+        """
+        directory = Path(settings.CLUSTERING_ARTIFACT_DIR)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            
+            def write_array(name: str, array: np.ndarray):
+                tmp = directory / f".{name}.{os.getpid()}.tmp.npy"
+                np.save(tmp, array)
+                os.replace(tmp, directory / f"{name}.npy")
+            
+            tmp = directory / f".kmeans.{os.getpid()}.tmp"
+            joblib.dump(kmeans, tmp)
+            os.replace(tmp, directory / "kmeans.joblib")
+            write_array("reference_embeddings", embeddings)
+            
+            meta = {
+                "key": self._artifact_key(),
+                "format": ARTIFACT_FORMAT_VERSION,
+                "model": settings.EMBEDDING_MODEL,
+                "n_clusters": self.n_clusters,
+                "n_questions": len(questions),
+                "categories": self._categories_for_questions(),
+            }
+            tmp = directory / f".meta.{os.getpid()}.tmp"
+            tmp.write_text(json.dumps(meta, indent=2))
+            os.replace(tmp, directory / "meta.json")
+            logger.info(f"Clustering artifact saved to {directory}")
+        except OSError as e:
+            logger.warning(f"Could not save clustering artifact: {e}")
+    
+    def _categories_for_questions(self) -> list[str]:
+        return [self.question_to_category.get(q, "Uncategorized") for q in questions]
+    
+    def _publish_snapshot(self, centroids: np.ndarray = None):
+        """Atomically replace the centroid snapshot used for prediction"""
+        if centroids is None:
+            centroids = self.kmeans.cluster_centers_
+        centroids = np.array(centroids)
+        sq_norms = (centroids ** 2).sum(axis=1)
+        reference_clusters = self._nearest(centroids, sq_norms, self._reference_embeddings)
+        categories, confidence = self._build_category_table(reference_clusters, len(centroids))
+        self._snapshot = ClusterSnapshot(
+            centroids=centroids,
+            centroid_sq_norms=sq_norms,
+            reference_clusters=reference_clusters,
+            cluster_categories=categories,
+            cluster_confidence=confidence
+        )
+    
+    def _build_category_table(self, reference_clusters: np.ndarray,
+                              n_clusters: int) -> tuple[list[str], np.ndarray]:
+        """
+        Map every cluster to its most common reference category.
+        
+        Args:
+            reference_clusters: Cluster of each reference question
+            n_clusters: Number of clusters
+            
+        Returns:
+            Tuple of (category per cluster, share of the cluster's
+            reference questions in that category)
+        """
+        categories = [f"Cluster_{i}" for i in range(n_clusters)]
+        confidence = np.zeros(n_clusters)
+        
+        for cluster_id in range(n_clusters):
+            counts = {}
+            for idx in np.where(reference_clusters == cluster_id)[0]:
+                category = self._reference_categories[idx]
+                counts[category] = counts.get(category, 0) + 1
+            
+            if counts:
+                best = max(counts, key=counts.get)
+                categories[cluster_id] = best
+                confidence[cluster_id] = counts[best] / sum(counts.values())
+        
+        return categories, confidence
+    
+    @staticmethod
+    def _nearest(centroids: np.ndarray, sq_norms: np.ndarray, embeddings: np.ndarray) -> np.ndarray:
+        """Index of the closest centroid for each embedding row"""
+        return np.argmin(sq_norms - 2 * embeddings @ centroids.T, axis=1)
+    
+    @traced("clustering")
+    def assign_cluster(self, question: str, embedding: list[float] = None) -> str:
         """
         Assign a category to a question.
         
         Args:
             question: Question to categorize
+            embedding: Precomputed question embedding (computed if None)
             
         Returns:
             Category name or cluster ID
@@ -71,37 +268,95 @@ class ClusteringService:
         if question in self.question_to_category:
             return self.question_to_category[question]
         
+        snapshot = self._snapshot
+        if snapshot is None:
+            return "Uncategorized"
+        
+        if embedding is None:
+            embedding = embed_text(question)
+        embedding = np.asarray(embedding, dtype=snapshot.centroids.dtype)
+        
+        if self.method == "nearest":
+            return self._nearest_reference_category(embedding)
+        
         # Predict cluster
-        embedding = np.array([embed_text(question)])
-        cluster_id = self.kmeans.predict(embedding)[0]
+        cluster_id = int(self._nearest(
+            snapshot.centroids, snapshot.centroid_sq_norms, embedding[np.newaxis]
+        )[0])
         
-        # Update model incrementally
-        self.kmeans.partial_fit(embedding)
+        # Queue for the background model update (dropped if the queue is full)
+        if self._updater is not None:
+            try:
+                self._updates.put_nowait(embedding)
+            except queue.Full:
+                pass
         
         # Find category
-        return self._find_category_for_cluster(cluster_id)
+        return self._find_category_for_cluster(cluster_id, snapshot)
+    
+    def _nearest_reference_category(self, embedding: np.ndarray) -> str:
+        """Category of the most cosine-similar reference question"""
+        return self._reference_categories[int(np.argmax(self._reference_unit @ embedding))]
     
-    def _find_category_for_cluster(self, cluster_id: int) -> str:
+    def _run_updates(self):
+        """Background loop: partial_fit queued embeddings in batches"""
+        interval = settings.CLUSTER_UPDATE_INTERVAL_SECONDS
+        batch_size = settings.CLUSTER_UPDATE_BATCH_SIZE
+        
+        batch = []
+        while True:
+            batch.append(self._updates.get())
+            deadline = time.monotonic() + interval
+            
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._updates.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self.kmeans.partial_fit(np.stack(batch))
+                self._publish_snapshot()
+                logger.info(f"Clustering updated with {len(batch)} questions")
+            except Exception as e:
+                logger.error(f"Clustering update failed: {e}")
+            batch = []
+    
+    def _find_category_for_cluster(self, cluster_id: int, snapshot: ClusterSnapshot) -> str:
         """
-        Find most common category in a cluster.
+        Find most common category in a cluster (precomputed lookup).
         
         Args:
             cluster_id: Cluster identifier
+            snapshot: Centroid snapshot the cluster was predicted with
             
         Returns:
             Most common category name
         """
-        matching_indices = np.where(self._reference_clusters == cluster_id)[0]
-        
-        if len(matching_indices) == 0:
-            return f"Cluster_{cluster_id}"
-        
-        # Count categories
-        category_counts = {}
-        for idx in matching_indices:
-            question = questions[idx]
-            category = self.question_to_category.get(question, "Uncategorized")
-            category_counts[category] = category_counts.get(category, 0) + 1
+        return snapshot.cluster_categories[cluster_id]
+    
+    def stats(self) -> dict:
+        """
+        Clustering metrics.
         
-        # Return most common
-        return max(category_counts, key=category_counts.get) if category_counts else f"Cluster_{cluster_id}"
\ No newline at end of file
+        Returns:
+            Dict with the method, pending updates and the
+            cluster -> (category, confidence) table
+        """
+        snapshot = self._snapshot
+        clusters = []
+        if snapshot is not None:
+            clusters = [
+                {"cluster": i, "category": category, "confidence": round(float(conf), 3)}
+                for i, (category, conf) in enumerate(
+                    zip(snapshot.cluster_categories, snapshot.cluster_confidence)
+                )
+            ]
+        return {
+            "method": self.method,
+            "pending_updates": self._updates.qsize(),
+            "clusters": clusters,
+        }
@@ -1,28 +1,146 @@
 """PDF document loading and processing"""
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import chain
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
+from pypdf import PdfReader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from typing import List
+from typing import Iterable, Iterator, List
 import logging
+import multiprocessing
+import os
+import re
 
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# First line mentioning "chapter" that is short enough to be a heading
+_CHAPTER_LINE = re.compile(r"^(?=[^\n]*chapter)[^\n]{0,99}$", re.IGNORECASE | re.MULTILINE)
 
-def load_and_split_pdf(pdf_path: str = None) -> List[Document]:
+
+def _extract_pages(path: str, start: int, end: int) -> list[tuple[int, str]]:
     """
-    Load PDF and split into chunks.
+    Extract the text of pages [start, end) (runs in a worker process).
+    
+    Returns:
+        List of (0-based page index, text)
+    """
+    reader = PdfReader(path)
+    return [(i, reader.pages[i].extract_text()) for i in range(start, end)]
+
+
+def iter_pdf_pages(path: str, workers: int = None, pages_per_task: int = None) -> Iterator[tuple[int, str]]:
+    """
+    Extract page texts, spread across a process pool, in page order.
+    
+    At most `2 * workers` page ranges are in flight, so memory stays
+    bounded regardless of the document size. Workers are spawned fresh
+    processes that only import this module.
+    
+    Args:
+        path: Path to PDF file
+        workers: Worker processes (settings.INGEST_WORKERS, 0 = CPU count)
+        pages_per_task: Pages extracted per task
+        
+    Yields:
+        (0-based page index, text)
+    """
+    workers = workers if workers is not None else settings.INGEST_WORKERS
+    workers = workers or os.cpu_count() or 1
+    pages_per_task = pages_per_task or settings.INGEST_PAGES_PER_TASK
+    n_pages = len(PdfReader(path).pages)
+    logger.info(f"Extracting {n_pages} pages with {workers} worker(s)")
+    
+    ranges = [(start, min(start + pages_per_task, n_pages))
+              for start in range(0, n_pages, pages_per_task)]
+    
+    if workers <= 1:
+        for start, end in ranges:
+            yield from _extract_pages(path, start, end)
+        return
+    
+    # spawn, not fork: this runs inside the multithreaded server (reindex
+    # thread, embedding batcher, torch threads) and a forked child could
+    # inherit a lock held by another thread and deadlock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(_extract_pages, path, start, end))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def iter_page_documents(pages: Iterable[tuple[int, str]], document: str = None) -> Iterator[Document]:
+    """
+    Wrap page texts into Documents with page and chapter metadata.
+    
+    The last detected chapter heading is carried over to the following
+    pages, so every page can be filtered by chapter.
+    
+    Args:
+        pages: (0-based page index, text) pairs, in page order
+        document: Source file name stored in the `document` metadata
+        
+    Yields:
+        One Document per page
+    """
+    chapter = None
+    for i, text in pages:
+        metadata = {'page': i, 'page_number': i + 1, 'source': 'PDF'}
+        if document:
+            metadata['document'] = document
+        
+        # Detect chapter information
+        match = _CHAPTER_LINE.search(text)
+        if match:
+            chapter = match.group(0).strip()
+        if chapter:
+            metadata['chapter'] = chapter
+        
+        yield Document(page_content=text, metadata=metadata)
+
+
+def iter_chunks(documents: Iterable[Document]) -> Iterator[Document]:
+    """
+    Split documents into chunks, one page at a time.
+    
+    Args:
+        documents: Page documents
+        
+    Yields:
+        Chunk documents (metadata gains `chunk_index` within the page)
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
+    )
+    
+    for doc in documents:
+        for index, chunk in enumerate(splitter.split_documents([doc])):
+            chunk.metadata['chunk_index'] = index
+            yield chunk
+
+
+def iter_pdf_chunks(pdf_path: str = None, workers: int = None) -> Iterator[Document]:
+    """
+    Streaming PDF ingestion: parallel page extraction -> chapter
+    detection -> splitting, as a lazy chunk stream.
     
     Args:
         pdf_path: Path to PDF file (uses settings.PDF_PATH if None)
+        workers: Extraction processes (settings.INGEST_WORKERS if None)
         
     Returns:
-        List of Document chunks with metadata
+        Iterator of Document chunks with metadata
         
     Raises:
-        FileNotFoundError: If PDF doesn't exist
+        FileNotFoundError: If PDF doesn't exist (raised immediately)
     """
     path = Path(pdf_path or settings.PDF_PATH)
 
@@ -30,38 +148,66 @@ def load_and_split_pdf(pdf_path: str = None) -> List[Document]:
         raise FileNotFoundError(f"PDF not found: {path}")
 
     logger.info(f"Loading PDF: {path}")
+    pages = iter_pdf_pages(str(path), workers=workers)
+    return iter_chunks(iter_page_documents(pages, document=path.name))
+
+
+def list_corpus_pdfs() -> List[Path]:
+    """
+    PDFs making up the corpus: every PDF in settings.PDF_DIR if set,
+    otherwise settings.PDF_PATH.
     
-    # Load PDF pages
-    documents = PyPDFLoader(str(path)).load()
-    logger.info(f"Loaded {len(documents)} pages")
+    Raises:
+        FileNotFoundError: If no PDF is found
+    """
+    if settings.PDF_DIR:
+        directory = Path(settings.PDF_DIR)
+        pdfs = sorted(p for p in directory.glob("*.pdf") if p.is_file()) if directory.is_dir() else []
+        if not pdfs:
+            raise FileNotFoundError(f"No PDF found in: {directory}")
+        return pdfs
     
-    # Enrich metadata
-    for i, doc in enumerate(documents):
-        page_num = i + 1
-        doc.metadata['page_number'] = page_num
-        doc.metadata['source'] = 'PDF'
+    path = Path(settings.PDF_PATH)
+    if not path.exists():
+        raise FileNotFoundError(f"PDF not found: {path}")
+    return [path]
+
+
+def iter_corpus_chunks(workers: int = None) -> Iterator[Document]:
+    """
+    Stream the chunks of every corpus PDF, one document after another.
+    
+    Args:
+        workers: Extraction processes (settings.INGEST_WORKERS if None)
         
-        # Detect chapter information
-        content_lower = doc.page_content.lower()
-        if 'chapter' in content_lower:
-            lines = doc.page_content.split('\n')
-            for line in lines:
-                if 'chapter' in line.lower() and len(line) < 100:
-                    doc.metadata['chapter'] = line.strip()
-                    break
-
-    # Split into chunks
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=settings.CHUNK_SIZE,
-        chunk_overlap=settings.CHUNK_OVERLAP,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
-    )
+    Returns:
+        Iterator of Document chunks (metadata includes `document`)
+        
+    Raises:
+        FileNotFoundError: If no PDF is found (raised immediately)
+    """
+    pdfs = list_corpus_pdfs()
+    logger.info(f"Corpus: {len(pdfs)} PDF(s)")
+    return chain.from_iterable(iter_pdf_chunks(str(p), workers=workers) for p in pdfs)
+
 
-    chunks = splitter.split_documents(documents)
+def load_and_split_pdf(pdf_path: str = None) -> List[Document]:
+    """
+    Load PDF and split into chunks.
+    
+    Args:
+        pdf_path: Path to PDF file (uses settings.PDF_PATH if None)
+        
+    Returns:
+        List of Document chunks with metadata
+        
+    Raises:
+        FileNotFoundError: If PDF doesn't exist
+    """
+    chunks = list(iter_pdf_chunks(pdf_path))
     logger.info(f"Created {len(chunks)} chunks")
     
     if chunks:
         logger.info(f"Sample chunk: {chunks[0].page_content[:150]}...")
     
-    return chunks
\ No newline at end of file
+    return chunks
@@ -1,11 +1,20 @@
 """Text embedding generation"""
+from concurrent.futures import Future
 from sentence_transformers import SentenceTransformer
+import logging
 import os
+import queue
+import threading
+import time
 
+from ..core.cache import LRUCache
 from ..core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Global model instance
 _model = None
+_model_lock = threading.Lock()
 
 
 def get_model() -> SentenceTransformer:
@@ -17,18 +26,187 @@ def get_model() -> SentenceTransformer:
     """
     global _model
     if _model is None:
-        # Set HuggingFace token if available
-        if settings.HF_TOKEN:
-            os.environ['HUGGINGFACE_HUB_TOKEN'] = settings.HF_TOKEN
-        
-        _model = SentenceTransformer(
-            settings.EMBEDDING_MODEL,
-            token=settings.HF_TOKEN,
-            trust_remote_code=True
-        )
+        # Startup loads components in parallel: load the model only once
+        with _model_lock:
+            if _model is None:
+                # Set HuggingFace token if available
+                if settings.HF_TOKEN:
+                    os.environ['HUGGINGFACE_HUB_TOKEN'] = settings.HF_TOKEN
+                
+                _model = SentenceTransformer(
+                    settings.EMBEDDING_MODEL,
+                    token=settings.HF_TOKEN,
+                    trust_remote_code=True
+                )
     return _model
 
 
+class EmbeddingBatcher:
+    """
+    Micro-batching scheduler for single-text embedding requests.
+
+    Concurrent callers enqueue their text and block on a future. A single
+    worker thread collects requests for up to `window_ms` (or until
+    `max_batch_size` is reached), runs one `encode` on the whole batch
+    and hands each caller its own vector.
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int):
+        """
+        Initialize the scheduler.
+
+        Args:
+            window_ms: Maximum time to wait for more requests after the first one
+            max_batch_size: Maximum number of texts encoded together
+        """
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def submit(self, text: str) -> list[float]:
+        """
+        Embed a text through the shared batch.
+
+        Args:
+            text: Text string
+
+        Returns:
+            Embedding vector
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use"""
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> list:
+        """Block for one request, then gather more until window or size limit"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker loop: encode one batch at a time"""
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            texts = [text for text, _, _ in batch]
+
+            try:
+                vectors = get_model().encode(texts)
+            except Exception as e:
+                logger.error(f"Embedding batch failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result(vectors[i].tolist())
+
+            self._record(batch, started)
+
+    def _record(self, batch: list, started: float):
+        """Update batch-size and queue-wait metrics"""
+        waits = [started - enqueued for _, _, enqueued in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._total_wait += sum(waits)
+            self._max_wait = max(self._max_wait, max(waits))
+
+    def stats(self) -> dict:
+        """
+        Scheduler metrics.
+
+        Returns:
+            Dict with batch counts, batch sizes and queue-wait times (ms)
+        """
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size": self._max_batch,
+                "avg_queue_wait_ms": self._total_wait * 1000 / self._items if self._items else 0.0,
+                "max_queue_wait_ms": self._max_wait * 1000,
+                "queue_depth": self._queue.qsize(),
+            }
+
+
+# Global scheduler instance
+_batcher = EmbeddingBatcher(
+    window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE
+)
+
+
+def get_batcher() -> EmbeddingBatcher:
+    """Get the shared embedding scheduler"""
+    return _batcher
+
+
+# Question embedding cache
+_cache = LRUCache(
+    max_size=settings.EMBEDDING_CACHE_SIZE,
+    ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS
+)
+
+
+def _cache_key(text: str) -> tuple[str, str]:
+    """Cache key: embedding model + case/whitespace-normalized text"""
+    return settings.EMBEDDING_MODEL, " ".join(text.split()).casefold()
+
+
+def get_embedding_cache() -> LRUCache:
+    """Get the shared question embedding cache"""
+    return _cache
+
+
+def warm_embedding_cache(texts: list[str], embeddings: list[list[float]] = None):
+    """
+    Pre-populate the embedding cache.
+    
+    Args:
+        texts: Texts to cache (e.g. predefined questions)
+        embeddings: Precomputed embeddings for texts (computed if None)
+    """
+    if embeddings is None:
+        embeddings = embed_texts(texts)
+    for text, embedding in zip(texts, embeddings):
+        _cache.set(_cache_key(text), [float(x) for x in embedding])
+    logger.info(f"Embedding cache warmed with {len(texts)} texts")
+
+
 def embed_texts(texts: list[str]) -> list[list[float]]:
     """
     Generate embeddings for multiple texts.
@@ -47,14 +225,27 @@ def embed_text(text: str) -> list[float]:
     """
     Generate embedding for a single text.
     
+    Results are cached by normalized text. On a miss, concurrent calls
+    are coalesced into one batch when EMBEDDING_BATCHING_ENABLED is set.
+    
     Args:
         text: Text string
         
     Returns:
         Embedding vector
     """
-    model = get_model()
-    return model.encode([text])[0].tolist()
+    key = _cache_key(text)
+    embedding = _cache.get(key)
+    if embedding is not None:
+        return embedding
+    
+    if settings.EMBEDDING_BATCHING_ENABLED:
+        embedding = _batcher.submit(text)
+    else:
+        embedding = get_model().encode([text])[0].tolist()
+    
+    _cache.set(key, embedding)
+    return embedding
 
 
 # Alias for compatibility
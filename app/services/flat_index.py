@@ -0,0 +1,191 @@
+"""Exact (brute-force) vector index over a memory-mapped embedding matrix"""
+from pathlib import Path
+from typing import Optional, Sequence
+import json
+import logging
+import os
+
+import numpy as np
+
+from ..core.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes
+INDEX_FORMAT_VERSION = 1
+
+# Rows scored per block when the matrix is stored as float16
+FLOAT16_BLOCK_ROWS = 16384
+
+
+class FlatIndex:
+    """
+    Flat index: L2-normalized embeddings in one contiguous matrix.
+
+    A query is one matrix product plus argpartition, exact rather than
+    approximate, and a batch of queries is a single matrix-matrix
+    product. The matrix is memory-mapped from disk (float32, or float16
+    to halve memory), so every worker shares the page cache instead of
+    holding its own copy.
+
+    Distances are squared L2 between unit vectors (2 - 2 cos), the same
+    scale as Chroma's default space, so distance thresholds carry over.
+    """
+
+    def __init__(self, matrix: np.ndarray, ids: list, documents: list, metadatas: list):
+        self.matrix = matrix
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self._masks = LRUCache(max_size=64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    @classmethod
+    def build(cls, ids: Sequence[str], embeddings, documents: Sequence[str],
+              metadatas: Sequence[Optional[dict]], dtype: str = "float32") -> "FlatIndex":
+        """
+        Build an in-memory index.
+
+        Args:
+            ids: Document IDs
+            embeddings: Document embeddings (n x dim)
+            documents: Document texts
+            metadatas: Document metadata (used for filtered search)
+            dtype: Matrix storage type, "float32" or "float16"
+
+        Returns:
+            FlatIndex
+        """
+        matrix = cls._normalize(embeddings) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+        return cls(
+            np.ascontiguousarray(matrix, dtype=np.dtype(dtype)),
+            list(ids), list(documents), [m or {} for m in metadatas]
+        )
+
+    def _mask(self, filters: Optional[dict]) -> Optional[np.ndarray]:
+        """Rows matching exact-match metadata filters (None values ignored), cached"""
+        conditions = tuple(sorted((k, v) for k, v in (filters or {}).items() if v is not None))
+        if not conditions:
+            return None
+        mask = self._masks.get(conditions)
+        if mask is None:
+            mask = np.fromiter(
+                (all(m.get(k) == v for k, v in conditions) for m in self.metadatas),
+                dtype=bool, count=len(self.metadatas)
+            )
+            self._masks.set(conditions, mask)
+        return mask
+
+    def _similarities(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarities (queries x rows), float16 upcast block by block"""
+        if self.matrix.dtype == np.float32:
+            return queries @ self.matrix.T
+        scores = np.empty((len(queries), len(self.matrix)), dtype=np.float32)
+        for start in range(0, len(self.matrix), FLOAT16_BLOCK_ROWS):
+            block = self.matrix[start:start + FLOAT16_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def search_many(self, query_embeddings, n_results: int = 10,
+                    filters: Optional[dict] = None) -> list[list[dict]]:
+        """
+        Top-k search for a batch of queries.
+
+        Args:
+            query_embeddings: Query embeddings (q x dim)
+            n_results: Results per query
+            filters: Exact-match metadata filters applied to every query
+
+        Returns:
+            One result list per query, shaped like VectorStore.search, best first
+        """
+        queries = self._normalize(query_embeddings)
+        if not len(self) or n_results <= 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = self._similarities(queries)
+        mask = self._mask(filters)
+        available = len(self)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+            available = int(mask.sum())
+
+        k = min(n_results, available)
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), (len(queries), k))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [
+                {
+                    "id": self.ids[i],
+                    "document": self.documents[i],
+                    "metadata": self.metadatas[i],
+                    "distance": float(max(0.0, 2.0 - 2.0 * s)),
+                }
+                for i, s in zip(row, row_scores)
+            ]
+            for row, row_scores in zip(top, top_scores)
+        ]
+
+    def search(self, query_embedding, n_results: int = 10,
+               filters: Optional[dict] = None) -> list[dict]:
+        """Top-k search for one query (see search_many)"""
+        return self.search_many([query_embedding], n_results, filters)[0]
+
+    def save(self, directory: Path):
+        """Persist the index (meta.json is written last and marks completion)"""
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / f".embeddings.{os.getpid()}.tmp.npy"
+        np.save(tmp, self.matrix)
+        os.replace(tmp, directory / "embeddings.npy")
+
+        meta = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "dtype": str(self.matrix.dtype),
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }
+        tmp = directory / f".meta.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, directory / "meta.json")
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["FlatIndex"]:
+        """
+        Open an index written by save(), memory-mapping the matrix.
+
+        Returns:
+            FlatIndex, or None if missing, from another format version or inconsistent
+        """
+        meta_path = directory / "meta.json"
+        if not meta_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("format_version") != INDEX_FORMAT_VERSION:
+                return None
+            matrix = np.load(directory / "embeddings.npy", mmap_mode="r")
+            if len(meta["ids"]) and matrix.shape[0] != len(meta["ids"]):
+                logger.warning(f"Flat index rows do not match its metadata: {directory}")
+                return None
+            return cls(matrix, meta["ids"], meta["documents"], meta["metadatas"])
+        except Exception as e:
+            logger.warning(f"Could not load flat index {directory}: {e}")
+            return None
@@ -1,32 +1,44 @@
 """LLM answer generation using Google Gemini"""
+from typing import AsyncIterator
 import logging
-import google.generativeai as genai
+import time
 
-from ..core.config import settings
+from ..core.tracing import record_stage, traced
+from .llm_client import LLMUnavailableError, get_llm_client
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-genai.configure(api_key=settings.GEMINI_API_KEY)
-
 MAX_ANSWER_LENGTH = 600
 
+# Prefixes of answers produced without a successful LLM call
+FALLBACK_PREFIXES = (
+    "I couldn't find relevant information",
+    "Sorry, I couldn't generate an answer",
+    "LLM connection error",
+)
 
-def generate_answer(question: str, context: str) -> str:
+
+class AnswerStreamError(Exception):
+    """Raised when the LLM stream fails after part of the answer was sent"""
+
+
+def is_fallback_answer(answer: str) -> bool:
+    """Whether an answer is a canned/error response rather than an LLM answer"""
+    return answer.startswith(FALLBACK_PREFIXES)
+
+
+def build_prompt(question: str, context: str) -> str:
     """
-    Generate answer using LLM with retrieved context.
+    Build the Gemini prompt from the question and retrieved context.
     
     Args:
         question: User's question
         context: Retrieved context from vector store
         
     Returns:
-        Generated answer or error message
+        Prompt text
     """
-    if not context.strip():
-        return f"I couldn't find relevant information for: '{question}'."
-    
-    prompt = f"""You are an IT support expert assistant based on "The IT Support Handbook" by Mike Halsey.
+    return f"""You are an IT support expert assistant based on "The IT Support Handbook" by Mike Halsey.
 
 Context from the book (with page numbers):
 {context}
@@ -42,27 +54,134 @@ Instructions:
 
 Answer in English:"""
 
+
+def _no_context_answer(question: str) -> str:
+    return f"I couldn't find relevant information for: '{question}'."
+
+
+def _error_answer(context: str, error: Exception) -> str:
+    if isinstance(error, LLMUnavailableError):
+        logger.warning(f"Gemini unavailable: {error}")
+    else:
+        logger.error(f"Gemini error: {error}")
+    return f"LLM connection error.\n\nFound information:\n{context[:500]}..."
+
+
+def _extract_answer(response) -> str:
+    if response and response.text:
+        return response.text.strip()
+    
+    return "Sorry, I couldn't generate an answer."
+
+
+@traced("llm")
+def generate_answer(question: str, context: str) -> str:
+    """
+    Generate answer using LLM with retrieved context.
+    
+    Args:
+        question: User's question
+        context: Retrieved context from vector store
+        
+    Returns:
+        Generated answer or error message
+    """
+    if not context.strip():
+        return _no_context_answer(question)
+    
+    prompt = build_prompt(question, context)
+
     try:
         logger.info("Calling Gemini API...")
         
-        model = genai.GenerativeModel(settings.LLM_MODEL)
+        response = get_llm_client().generate(prompt)
         
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.2,
-                top_p=0.8,
-                max_output_tokens=1024
-            )
-        )
+        logger.info("Received Gemini response")
+        return _extract_answer(response)
+    
+    except Exception as e:
+        return _error_answer(context, e)
+
+
+@traced("llm")
+async def generate_answer_async(question: str, context: str) -> str:
+    """
+    Non-blocking variant of generate_answer for the async query path.
+    
+    Args:
+        question: User's question
+        context: Retrieved context from vector store
+        
+    Returns:
+        Generated answer or error message
+    """
+    if not context.strip():
+        return _no_context_answer(question)
+    
+    prompt = build_prompt(question, context)
+
+    try:
+        logger.info("Calling Gemini API (async)...")
+        
+        response = await get_llm_client().generate_async(prompt)
         
         logger.info("Received Gemini response")
+        return _extract_answer(response)
+    
+    except Exception as e:
+        return _error_answer(context, e)
+
+
+async def stream_answer_async(question: str, context: str) -> AsyncIterator[str]:
+    """
+    Stream the answer as Gemini produces it.
+    
+    Args:
+        question: User's question
+        context: Retrieved context from vector store
         
-        if response and response.text:
-            return response.text.strip()
+    Yields:
+        Answer text fragments (a single fallback message on error before
+        any fragment)
+    
+    Raises:
+        AnswerStreamError: If the stream fails after fragments were yielded
+            (the answer is truncated and must not be reused)
+    """
+    if not context.strip():
+        yield _no_context_answer(question)
+        return
+    
+    prompt = build_prompt(question, context)
+    produced = False
+    # LLM time excludes the time spent suspended while the consumer sends fragments
+    llm_seconds = 0.0
+    resumed = time.perf_counter()
+
+    try:
+        logger.info("Calling Gemini API (stream)...")
         
-        return "Sorry, I couldn't generate an answer."
+        async for chunk in get_llm_client().stream_async(prompt):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. safety or finish metadata)
+                continue
+            if text:
+                produced = True
+                llm_seconds += time.perf_counter() - resumed
+                yield text
+                resumed = time.perf_counter()
+        
+        logger.info("Gemini stream finished")
+        if not produced:
+            yield "Sorry, I couldn't generate an answer."
     
     except Exception as e:
-        logger.error(f"Gemini error: {e}")
-        return f"LLM connection error.\n\nFound information:\n{context[:500]}..."
\ No newline at end of file
+        answer = _error_answer(context, e)
+        if produced:
+            raise AnswerStreamError(f"LLM stream interrupted: {e}") from e
+        yield answer
+    
+    finally:
+        record_stage("llm", llm_seconds + time.perf_counter() - resumed)
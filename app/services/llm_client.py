@@ -0,0 +1,249 @@
+"""Long-lived Gemini client with concurrency limit, retries and circuit breaker"""
+from typing import AsyncIterator
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from ..core.config import settings
+from ..core.resilience import CircuitBreaker, ConcurrencyLimit, LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying (rate limit and server-side errors)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, 5xx and timeouts are retried, everything else is not"""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, google_exceptions.GoogleAPICallError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class GeminiClient:
+    """
+    Shared Gemini client.
+
+    The API is configured once and the GenerativeModel (with its
+    generation config and underlying transport) is reused across calls.
+    Every call is bounded by a concurrency limit (shared by blocking and
+    async callers) and a timeout,
+    retried with jittered exponential backoff on 429/5xx, and guarded by
+    a circuit breaker so an outage fails fast instead of piling up.
+    """
+
+    def __init__(self):
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._slots = ConcurrencyLimit(settings.LLM_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=settings.LLM_CIRCUIT_RESET_SECONDS
+        )
+
+    @property
+    def model(self) -> genai.GenerativeModel:
+        """Configured GenerativeModel (created on first use)"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    genai.configure(api_key=settings.GEMINI_API_KEY)
+                    self._model = genai.GenerativeModel(
+                        settings.LLM_MODEL,
+                        generation_config=genai.types.GenerationConfig(
+                            temperature=0.2,
+                            top_p=0.8,
+                            max_output_tokens=1024
+                        )
+                    )
+        return self._model
+
+    @property
+    def _request_options(self) -> dict:
+        return {"timeout": settings.LLM_TIMEOUT_SECONDS}
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Full-jitter exponential backoff delay"""
+        cap = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt)
+        return random.uniform(0, cap)
+
+    def _record_error(self, error: Exception):
+        """Count upstream failures (429/5xx, timeouts) toward the circuit breaker"""
+        if _is_retryable(error):
+            self.breaker.record_failure()
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if attempt >= settings.LLM_MAX_RETRIES or not _is_retryable(error):
+            return False
+        logger.warning(f"Gemini call failed ({error}), retry {attempt + 1}/{settings.LLM_MAX_RETRIES}")
+        return True
+
+    def generate(self, prompt: str):
+        """
+        Generate a response (blocking).
+
+        Args:
+            prompt: Prompt text
+
+        Returns:
+            Gemini response
+
+        Raises:
+            LLMUnavailableError: If the circuit is open or no slot frees up in time
+            Exception: The last Gemini error once retries are exhausted
+        """
+        trial = self.breaker.before_call()
+        try:
+            # Local saturation says nothing about the upstream: not a breaker failure
+            if not self._slots.acquire(settings.LLM_TIMEOUT_SECONDS):
+                raise LLMUnavailableError("LLM concurrency limit reached")
+
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        response = self.model.generate_content(
+                            prompt, request_options=self._request_options
+                        )
+                        self.breaker.record_success()
+                        return response
+                    except Exception as e:
+                        if not self._should_retry(e, attempt):
+                            self._record_error(e)
+                            raise
+                        time.sleep(self._backoff(attempt))
+                        attempt += 1
+            finally:
+                self._slots.release()
+        finally:
+            if trial:
+                self.breaker.release_trial()
+
+    async def generate_async(self, prompt: str):
+        """
+        Generate a response without blocking the event loop.
+
+        Args:
+            prompt: Prompt text
+
+        Returns:
+            Gemini response
+
+        Raises:
+            LLMUnavailableError: If the circuit is open or no slot frees up in time
+            Exception: The last Gemini error once retries are exhausted
+        """
+        trial = self.breaker.before_call()
+        try:
+            if not await self._slots.acquire_async(settings.LLM_TIMEOUT_SECONDS):
+                raise LLMUnavailableError("LLM concurrency limit reached")
+
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        response = await asyncio.wait_for(
+                            self.model.generate_content_async(
+                                prompt, request_options=self._request_options
+                            ),
+                            settings.LLM_TIMEOUT_SECONDS
+                        )
+                        self.breaker.record_success()
+                        return response
+                    except Exception as e:
+                        if not self._should_retry(e, attempt):
+                            self._record_error(e)
+                            raise
+                        await asyncio.sleep(self._backoff(attempt))
+                        attempt += 1
+            finally:
+                self._slots.release()
+        finally:
+            # Cancellation (client disconnect, batch teardown) must not strand the trial
+            if trial:
+                self.breaker.release_trial()
+
+    async def stream_async(self, prompt: str) -> AsyncIterator:
+        """
+        Stream a response without blocking the event loop.
+
+        Opening the stream is retried like generate_async; errors after
+        the first chunk are not retried (the caller already has output).
+
+        Args:
+            prompt: Prompt text
+
+        Yields:
+            Gemini response chunks
+
+        Raises:
+            LLMUnavailableError: If the circuit is open or no slot frees up in time
+            Exception: The last Gemini error once retries are exhausted
+        """
+        trial = self.breaker.before_call()
+        try:
+            if not await self._slots.acquire_async(settings.LLM_TIMEOUT_SECONDS):
+                raise LLMUnavailableError("LLM concurrency limit reached")
+
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        response = await asyncio.wait_for(
+                            self.model.generate_content_async(
+                                prompt, stream=True, request_options=self._request_options
+                            ),
+                            settings.LLM_TIMEOUT_SECONDS
+                        )
+                        break
+                    except Exception as e:
+                        if not self._should_retry(e, attempt):
+                            self._record_error(e)
+                            raise
+                        await asyncio.sleep(self._backoff(attempt))
+                        attempt += 1
+
+                try:
+                    async for chunk in response:
+                        yield chunk
+                except Exception as e:
+                    self._record_error(e)
+                    raise
+                self.breaker.record_success()
+            finally:
+                self._slots.release()
+        finally:
+            # Cancellation or early close (GeneratorExit on SSE disconnect) must not strand the trial
+            if trial:
+                self.breaker.release_trial()
+
+    def stats(self) -> dict:
+        """Circuit breaker state and slots in use"""
+        return {
+            "circuit": self.breaker.state,
+            "in_flight": self._slots.in_use,
+            "max_concurrency": self._slots.limit,
+        }
+
+
+# Global client instance
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> GeminiClient:
+    """Get or create the shared Gemini client (singleton pattern)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+    return _client
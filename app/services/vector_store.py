@@ -2,65 +2,439 @@
 Vector store avec ChromaDB
 """
 from pathlib import Path
+from typing import Optional
+import hashlib
 import logging
+import os
+import shutil
+import threading
 
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from langchain_core.documents import Document
 
 from ..core.config import settings
+from ..core.tracing import traced
+from ..services.bm25_index import BM25Index
 from ..services.embeddings import embed_text, embed_texts
+from ..services.flat_index import FlatIndex
 
 logger = logging.getLogger(__name__)
 
+# Chroma rejects very large write batches
+WRITE_BATCH_SIZE = 512
+
+DEFAULT_COLLECTION = "it_support_docs"
+# Fichier pointant vers la collection servie (mis à jour après réindexation)
+ACTIVE_COLLECTION_FILE = "active_collection"
+
+# Index dérivés persistés à côté des données Chroma : BM25 (un fichier par
+# collection) et index plat NumPy (un répertoire par collection)
+LEXICAL_INDEX_DIR = "bm25"
+FLAT_INDEX_DIR = "flat"
+
+# Client Chroma partagé (un seul par répertoire de persistance)
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_chroma_client():
+    """Get or create the shared Chroma client (singleton pattern)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                persist_dir = Path(settings.CHROMA_PERSIST_DIR)
+                persist_dir.mkdir(parents=True, exist_ok=True)
+                _client = chromadb.PersistentClient(
+                    path=str(persist_dir),
+                    settings=ChromaSettings(anonymized_telemetry=False)
+                )
+    return _client
+
+
+def get_active_collection_name() -> str:
+    """Nom de la collection actuellement servie"""
+    pointer = Path(settings.CHROMA_PERSIST_DIR) / ACTIVE_COLLECTION_FILE
+    try:
+        name = pointer.read_text().strip()
+        return name or DEFAULT_COLLECTION
+    except FileNotFoundError:
+        return DEFAULT_COLLECTION
+
+
+def set_active_collection_name(name: str):
+    """Bascule atomiquement la collection servie (lue par tous les workers)"""
+    persist_dir = Path(settings.CHROMA_PERSIST_DIR)
+    tmp = persist_dir / f".{ACTIVE_COLLECTION_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(name)
+    os.replace(tmp, persist_dir / ACTIVE_COLLECTION_FILE)
+
+
+def lexical_index_path(collection_name: str) -> Path:
+    """Fichier de l'index BM25 d'une collection"""
+    return Path(settings.CHROMA_PERSIST_DIR) / LEXICAL_INDEX_DIR / f"{collection_name}.npz"
+
+
+def flat_index_dir(collection_name: str) -> Path:
+    """Répertoire de l'index plat d'une collection"""
+    return Path(settings.CHROMA_PERSIST_DIR) / FLAT_INDEX_DIR / collection_name
+
+
+def delete_search_indexes(collection_name: str):
+    """Supprime les index dérivés d'une collection (collection supprimée)"""
+    lexical_index_path(collection_name).unlink(missing_ok=True)
+    shutil.rmtree(flat_index_dir(collection_name), ignore_errors=True)
+
 
 class VectorStore:
-    def __init__(self):
+    def __init__(self, collection_name: Optional[str] = None):
         self.persist_dir = Path(settings.CHROMA_PERSIST_DIR)
-        self.persist_dir.mkdir(parents=True, exist_ok=True)
-
-        self.client = chromadb.PersistentClient(
-            path=str(self.persist_dir),
-            settings=ChromaSettings(anonymized_telemetry=False)
-        )
+        self.client = get_chroma_client()
 
+        self.collection_name = collection_name or get_active_collection_name()
         self.collection = self.client.get_or_create_collection(
-            name="it_support_docs"
+            name=self.collection_name
         )
+        # Index dérivés chargés au premier accès ({"bm25": ..., "flat": ...})
+        self._indexes = {}
+        self._indexes_lock = threading.Lock()
         
-        logger.info(f"📊 Collection chargée avec {self.collection.count()} documents")
+        logger.info(
+            f"📊 Collection '{self.collection_name}' chargée avec {self.collection.count()} documents"
+        )
 
-    def add_documents(self, documents):
-        # Récupérer le nombre actuel de documents pour générer des IDs uniques
-        current_count = self.collection.count()
-        logger.info(f"📊 Documents actuels dans la collection : {current_count}")
-        
-        texts = [doc.page_content for doc in documents]
-        metadatas = [doc.metadata for doc in documents]
-        ids = [f"doc_{current_count + i}" for i in range(len(documents))]
+    @staticmethod
+    def document_id(doc) -> str:
+        """ID stable across reindexes: hash of source, document, page and chunk text"""
+        metadata = doc.metadata or {}
+        parts = [str(metadata.get("source", ""))]
+        if metadata.get("document"):
+            parts.append(str(metadata["document"]))
+        parts += [str(metadata.get("page_number", "")), doc.page_content]
+        key = "\x1f".join(parts)
+        return "doc_" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
 
-        embeddings = embed_texts(texts)
+    def _existing_ids(self) -> set:
+        return set(self.collection.get(include=[])["ids"])
 
-        self.collection.add(
-            embeddings=embeddings,
+    def _upsert(self, ids, documents):
+        """Embed and upsert one batch of documents"""
+        if not ids:
+            return
+        texts = [doc.page_content for doc in documents]
+        self.collection.upsert(
+            embeddings=embed_texts(texts),
             documents=texts,
-            metadatas=metadatas,
+            metadatas=[doc.metadata for doc in documents],
             ids=ids
         )
+
+    def _copy_from(self, source: "VectorStore", ids, documents) -> list:
+        """
+        Copy the embeddings of one batch of documents from another collection.
+        
+        Only the vectors are reused: text and metadata are written from
+        `documents`, since metadata outside the ID hash (chapter,
+        chunk_index...) may have changed since the source was built.
+        
+        Returns:
+            IDs that were not found in the source collection
+        """
+        batch = source.collection.get(ids=ids, include=["embeddings"])
+        embeddings = dict(zip(batch["ids"], batch["embeddings"]))
+        found = [(i, d) for i, d in zip(ids, documents) if i in embeddings]
+        if found:
+            self.collection.upsert(
+                ids=[i for i, _ in found],
+                embeddings=[embeddings[i] for i, _ in found],
+                documents=[d.page_content for _, d in found],
+                metadatas=[d.metadata for _, d in found]
+            )
+        return [doc_id for doc_id in ids if doc_id not in embeddings]
+
+    def _refresh_metadata(self, ids, documents) -> int:
+        """
+        Rewrite existing entries whose metadata changed, keeping their embedding.
+        
+        Chroma merges metadata on update (keys missing from the new dict
+        are kept), so changed entries are deleted and re-added instead.
+        
+        Returns:
+            Number of entries rewritten
+        """
+        current = self.collection.get(ids=ids, include=["metadatas"])
+        stored = dict(zip(current["ids"], current["metadatas"]))
+        changed = [(i, d) for i, d in zip(ids, documents) if i in stored and stored[i] != d.metadata]
+        if not changed:
+            return 0
+        changed_ids = [i for i, _ in changed]
+        vectors = self.collection.get(ids=changed_ids, include=["embeddings"])
+        embeddings = dict(zip(vectors["ids"], vectors["embeddings"]))
+        self.collection.delete(ids=changed_ids)
+        self.collection.add(
+            ids=changed_ids,
+            embeddings=[embeddings[i] for i in changed_ids],
+            documents=[d.page_content for _, d in changed],
+            metadatas=[d.metadata for _, d in changed]
+        )
+        return len(changed)
+
+    def _delete(self, ids):
+        for start in range(0, len(ids), WRITE_BATCH_SIZE):
+            self.collection.delete(ids=ids[start:start + WRITE_BATCH_SIZE])
+
+    def _write_new(self, documents, existing: set, seen: set,
+                   reuse_from: "VectorStore" = None) -> dict:
+        """
+        Stream documents into the collection in bounded batches.
+        
+        Documents whose content-hash ID is not in `existing` are written
+        (embeddings copied from `reuse_from` when possible, embedded
+        otherwise). Documents already present keep their embedding, but
+        their metadata is refreshed when it changed. `seen` collects every
+        ID of the stream.
+        
+        Returns:
+            Dict with added, embedded, unchanged and updated counts
+        """
+        counts = {"added": 0, "embedded": 0, "unchanged": 0, "updated": 0}
+        batch_ids, batch_docs = [], []
+        kept_ids, kept_docs = [], []
+        
+        def flush():
+            to_embed = batch_ids
+            if reuse_from is not None:
+                to_embed = self._copy_from(reuse_from, batch_ids, batch_docs)
+            embed_set = set(to_embed)
+            self._upsert(to_embed, [d for i, d in zip(batch_ids, batch_docs) if i in embed_set])
+            counts["added"] += len(batch_ids)
+            counts["embedded"] += len(to_embed)
+        
+        def flush_kept():
+            counts["updated"] += self._refresh_metadata(kept_ids, kept_docs)
+        
+        for doc in documents:
+            doc_id = self.document_id(doc)
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            
+            if doc_id in existing:
+                counts["unchanged"] += 1
+                kept_ids.append(doc_id)
+                kept_docs.append(doc)
+                if len(kept_ids) >= WRITE_BATCH_SIZE:
+                    flush_kept()
+                    kept_ids, kept_docs = [], []
+                continue
+            
+            batch_ids.append(doc_id)
+            batch_docs.append(doc)
+            if len(batch_ids) >= WRITE_BATCH_SIZE:
+                flush()
+                batch_ids, batch_docs = [], []
+        
+        if batch_ids:
+            flush()
+        if kept_ids:
+            flush_kept()
+        return counts
+
+    def add_documents(self, documents):
+        """
+        Ajoute des documents (idempotent).
+        
+        Les IDs sont dérivés du contenu : seuls les documents absents
+        de la collection sont embeddés et insérés, par lots bornés.
+        """
+        current_count = self.collection.count()
+        logger.info(f"📊 Documents actuels dans la collection : {current_count}")
+        
+        self._write_new(documents, self._existing_ids(), set())
         
         # Vérifier que l'ajout a fonctionné
         new_count = self.collection.count()
         logger.info(f"✅ Documents après ajout : {new_count} (ajoutés : {new_count - current_count})")
+        self.build_search_indexes()
+
+    def sync_documents(self, documents, reuse_from: "VectorStore" = None) -> dict:
+        """
+        Synchronise la collection avec un corpus complet (réindexation incrémentale).
+        
+        Le corpus peut être un itérateur : il est consommé par lots bornés
+        (embedding + upsert), la mémoire ne dépend pas de sa taille.
+        Seuls les chunks nouveaux ou modifiés sont embeddés ; les chunks
+        qui ne font plus partie du corpus sont supprimés à la fin.
+        
+        Args:
+            documents: Corpus complet (questions + chunks PDF), liste ou itérateur
+            reuse_from: Collection dont les embeddings existants sont recopiés
+                (construction d'une nouvelle collection sans tout ré-embedder)
+            
+        Returns:
+            Dict avec le nombre de documents ajoutés, embeddés, supprimés, inchangés
+                et inchangés dont les métadonnées ont été mises à jour
+        """
+        existing = self._existing_ids()
+        seen = set()
+        
+        counts = self._write_new(documents, existing, seen, reuse_from=reuse_from)
+        stale_ids = [doc_id for doc_id in existing if doc_id not in seen]
+        self._delete(stale_ids)
+        counts["deleted"] = len(stale_ids)
+        
+        logger.info(
+            f"🔄 Sync : {counts['added']} nouveaux ({counts['embedded']} embeddés), "
+            f"{counts['deleted']} obsolètes, {counts['unchanged']} inchangés "
+            f"(métadonnées mises à jour : {counts['updated']})"
+        )
+        logger.info(f"✅ Collection synchronisée : {self.collection.count()} documents")
+        self.build_search_indexes()
+        return counts
+
+    def _read_all(self, include: list) -> dict:
+        """Relit toute la collection par pages"""
+        data = {"ids": [], **{field: [] for field in include}}
+        offset = 0
+        while True:
+            page = self.collection.get(include=include, limit=WRITE_BATCH_SIZE * 8, offset=offset)
+            if not len(page["ids"]):
+                break
+            for field in data:
+                data[field] += list(page[field])
+            offset += len(page["ids"])
+        return data
+
+    def build_search_indexes(self):
+        """
+        Construit et persiste les index dérivés de la collection.
+        
+        Appelé en fin d'indexation : la collection est relue une fois
+        (avec les embeddings seulement si VECTOR_BACKEND=flat).
+        """
+        flat = settings.VECTOR_BACKEND == "flat"
+        data = self._read_all(["documents", "metadatas"] + (["embeddings"] if flat else []))
+        self.build_lexical_index(data)
+        if flat:
+            self.build_flat_index(data)
+
+    def _set_index(self, name: str, index):
+        with self._indexes_lock:
+            self._indexes[name] = index
+
+    def _get_index(self, name: str, loader):
+        """Index dérivé `name`, chargé une seule fois (None s'il n'existe pas)"""
+        if name not in self._indexes:
+            with self._indexes_lock:
+                if name not in self._indexes:
+                    self._indexes[name] = loader()
+                    if self._indexes[name] is None:
+                        logger.warning(
+                            f"⚠️ Pas d'index {name} pour '{self.collection_name}' "
+                            "(réindexer pour l'activer)"
+                        )
+        return self._indexes[name]
+
+    def build_lexical_index(self, data: dict = None) -> BM25Index:
+        """
+        Construit et persiste l'index BM25 de la collection.
+        
+        Args:
+            data: Contenu déjà relu (ids, documents, metadatas), relu si None
+        """
+        data = data or self._read_all(["documents", "metadatas"])
+        index = BM25Index.build(data["ids"], data["documents"], data["metadatas"])
+        index.save(lexical_index_path(self.collection_name))
+        self._set_index("bm25", index)
+        logger.info(f"🔤 Index BM25 : {len(index)} documents, {len(index.terms)} termes")
+        return index
+
+    def build_flat_index(self, data: dict = None) -> FlatIndex:
+        """
+        Construit et persiste l'index plat (embeddings normalisés, mmap).
+        
+        Args:
+            data: Contenu déjà relu (avec embeddings), relu si None
+        """
+        data = data or self._read_all(["embeddings", "documents", "metadatas"])
+        index = FlatIndex.build(
+            data["ids"], data["embeddings"], data["documents"], data["metadatas"],
+            dtype=settings.FLAT_INDEX_DTYPE
+        )
+        directory = flat_index_dir(self.collection_name)
+        index.save(directory)
+        # Servir depuis le fichier mappé (pages partagées entre workers)
+        self._set_index("flat", FlatIndex.load(directory) or index)
+        logger.info(f"🧮 Index plat : {len(index)} vecteurs ({settings.FLAT_INDEX_DTYPE})")
+        return index
+
+    @property
+    def lexical_index(self) -> Optional[BM25Index]:
+        """Index BM25 de la collection (None s'il n'a pas encore été construit)"""
+        return self._get_index("bm25", lambda: BM25Index.load(lexical_index_path(self.collection_name)))
+
+    @property
+    def flat_index(self) -> Optional[FlatIndex]:
+        """Index plat de la collection (None s'il n'a pas encore été construit)"""
+        return self._get_index("flat", lambda: FlatIndex.load(flat_index_dir(self.collection_name)))
+
+    @traced("retrieval")
+    def lexical_search(self, query: str, n_results: int = 10, filters=None) -> list:
+        """
+        Recherche lexicale BM25 (résultats au format de search(), distance None).
+        
+        Returns:
+            Liste vide si l'index n'a pas encore été construit
+        """
+        index = self.lexical_index
+        if index is None:
+            return []
+        return index.search(query, n_results=n_results, filters=filters)
+
+    @staticmethod
+    def build_where(filters: Optional[dict]) -> Optional[dict]:
+        """
+        Filtre Chroma `where` à partir de métadonnées (valeurs None ignorées).
+        
+        Args:
+            filters: Ex. {"document": "handbook.pdf", "chapter": "Chapter 18: ..."}
+            
+        Returns:
+            Clause `where` Chroma, ou None sans filtre
+        """
+        clauses = [{key: value} for key, value in (filters or {}).items() if value is not None]
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
 
-    def search(self, query, n_results=3):
-        logger.info(f"🔍 Searching for: {query}")
-        logger.info(f"📊 Collection size: {self.collection.count()}")
+    def _flat_backend(self) -> Optional[FlatIndex]:
+        """Index plat si VECTOR_BACKEND=flat et qu'il est construit (sinon Chroma)"""
+        if settings.VECTOR_BACKEND != "flat":
+            return None
+        return self.flat_index
+
+    @traced("retrieval")
+    def search(self, query, n_results=3, query_embedding=None, filters=None):
+        logger.info(f"🔍 Searching for: {query} (k={n_results})")
         
-        query_embedding = embed_text(query)
+        # Réutiliser l'embedding déjà calculé par le pipeline si fourni
+        if query_embedding is None:
+            query_embedding = embed_text(query)
+
+        flat = self._flat_backend()
+        if flat is not None:
+            return flat.search(query_embedding, n_results=n_results, filters=filters)
+
+        # Pré-filtrage par métadonnées : seuls les chunks concernés sont classés
+        where = self.build_where(filters)
+        if where:
+            logger.info(f"🔎 Filtre : {where}")
 
         results = self.collection.query(
             query_embeddings=[query_embedding],
-            n_results=n_results
+            n_results=n_results,
+            where=where
         )
 
         logger.info(f"📦 Found {len(results['ids'][0])} results")
@@ -76,4 +450,46 @@ class VectorStore:
                 "distance": results["distances"][0][i],
             }
             for i in range(len(results["ids"][0]))
-        ]
\ No newline at end of file
+        ]
+
+    @traced("retrieval")
+    def search_many(self, queries, n_results=3, query_embeddings=None, filters=None) -> list:
+        """
+        Recherche groupée : une seule requête au backend pour plusieurs questions.
+        
+        Args:
+            queries: Questions
+            n_results: Résultats par question
+            query_embeddings: Embeddings déjà calculés (calculés en lot si None)
+            filters: Filtre de métadonnées commun à toutes les questions
+            
+        Returns:
+            Une liste de résultats (format de search()) par question
+        """
+        if not queries:
+            return []
+        logger.info(f"🔍 Recherche groupée : {len(queries)} questions (k={n_results})")
+        if query_embeddings is None:
+            query_embeddings = embed_texts(list(queries))
+
+        flat = self._flat_backend()
+        if flat is not None:
+            return flat.search_many(query_embeddings, n_results=n_results, filters=filters)
+
+        results = self.collection.query(
+            query_embeddings=[list(e) for e in query_embeddings],
+            n_results=n_results,
+            where=self.build_where(filters)
+        )
+        return [
+            [
+                {
+                    "id": results["ids"][q][i],
+                    "document": results["documents"][q][i],
+                    "metadata": results["metadatas"][q][i],
+                    "distance": results["distances"][q][i],
+                }
+                for i in range(len(results["ids"][q]))
+            ]
+            for q in range(len(results["ids"]))
+        ]
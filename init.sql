@@ -21,6 +21,7 @@ CREATE TABLE IF NOT EXISTS users (
     email VARCHAR(255) UNIQUE NOT NULL,
     hashed_password VARCHAR(255) NOT NULL,
     is_active BOOLEAN DEFAULT TRUE,
+    is_admin BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -31,13 +32,73 @@ CREATE TABLE IF NOT EXISTS queries (
     answer TEXT NOT NULL,
     cluster VARCHAR(255),
     latency_ms FLOAT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    time_to_first_token_ms FLOAT,
+    incomplete BOOLEAN,
+    embedding_ms FLOAT,
+    clustering_ms FLOAT,
+    retrieval_ms FLOAT,
+    context_ms FLOAT,
+    llm_ms FLOAT,
+    retrieved_docs INTEGER,
+    context_tokens INTEGER,
+    cache_hit BOOLEAN,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    inserted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Colonnes ajoutées après la création initiale
+ALTER TABLE users ADD COLUMN IF NOT EXISTS is_admin BOOLEAN DEFAULT FALSE;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS time_to_first_token_ms FLOAT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS incomplete BOOLEAN;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS embedding_ms FLOAT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS clustering_ms FLOAT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS retrieval_ms FLOAT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS context_ms FLOAT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS llm_ms FLOAT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS retrieved_docs INTEGER;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS context_tokens INTEGER;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS cache_hit BOOLEAN;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+-- Agrégats incrémentaux pour /admin/analytics (voir app/services/analytics.py)
+CREATE TABLE IF NOT EXISTS query_stats_hourly (
+    hour TIMESTAMP WITH TIME ZONE NOT NULL,
+    cluster VARCHAR(255) NOT NULL,
+    query_count BIGINT NOT NULL,
+    latency_sum_ms FLOAT NOT NULL,
+    latency_buckets BIGINT[] NOT NULL,
+    PRIMARY KEY (hour, cluster)
+);
+
+CREATE TABLE IF NOT EXISTS user_query_stats_daily (
+    day DATE NOT NULL,
+    user_id INTEGER NOT NULL,
+    query_count BIGINT NOT NULL,
+    latency_sum_ms FLOAT NOT NULL,
+    PRIMARY KEY (day, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS question_stats_daily (
+    day DATE NOT NULL,
+    question_hash VARCHAR(32) NOT NULL,
+    question TEXT NOT NULL,
+    query_count BIGINT NOT NULL,
+    PRIMARY KEY (day, question_hash)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+    name VARCHAR(64) PRIMARY KEY,
+    last_query_id BIGINT NOT NULL DEFAULT 0
 );
 
 -- Index pour optimiser les requêtes
 CREATE INDEX IF NOT EXISTS idx_queries_user_id ON queries(user_id);
 CREATE INDEX IF NOT EXISTS idx_queries_created_at ON queries(created_at);
+CREATE INDEX IF NOT EXISTS idx_queries_cluster_created_at ON queries(cluster, created_at);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+-- Pagination par curseur (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_queries_user_created_at_id ON queries(user_id, created_at, id);
 
 -- Donner les permissions sur les tables et séquences existantes
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO raguser;
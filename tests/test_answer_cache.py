@@ -0,0 +1,185 @@
+"""Semantic answer cache: lookup, store, expiry and use by the pipeline (stubbed LLM)"""
+import numpy as np
+import pytest
+
+from app.rag import answer_cache as answer_cache_module
+from app.rag.answer_cache import SemanticAnswerCache
+
+DIM = 8
+
+
+def _unit(*components) -> np.ndarray:
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[:len(components)] = components
+    return vector / np.linalg.norm(vector)
+
+
+class FakeClock:
+    """Stand-in for the `time` module with a settable monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def test_hit_above_threshold():
+    cache = SemanticAnswerCache(max_size=4, threshold=0.95)
+    cache.store(_unit(1, 0), "Restart the print spooler.", "Printing")
+
+    # cos = 0.995
+    assert cache.lookup(_unit(1, 0.1)) == ("Restart the print spooler.", "Printing")
+    assert cache.stats()["hits"] == 1
+
+
+def test_miss_below_threshold():
+    cache = SemanticAnswerCache(max_size=4, threshold=0.95)
+    cache.store(_unit(1, 0), "Restart the print spooler.", "Printing")
+
+    # cos = 0.8
+    assert cache.lookup(_unit(0.8, 0.6)) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_lookup_on_empty_cache_misses():
+    cache = SemanticAnswerCache(max_size=4, threshold=0.95)
+
+    assert cache.lookup(_unit(1, 0)) is None
+    assert cache.stats()["hit_rate"] == 0.0
+
+
+def test_lookup_is_scale_invariant():
+    cache = SemanticAnswerCache(max_size=4, threshold=0.95)
+    cache.store(_unit(0, 1) * 7, "Use Event Viewer.", "Logs")
+
+    assert cache.lookup(_unit(0, 1) * 0.1) == ("Use Event Viewer.", "Logs")
+
+
+def test_best_match_wins():
+    cache = SemanticAnswerCache(max_size=4, threshold=0.9)
+    cache.store(_unit(1, 0), "a", "A")
+    cache.store(_unit(1, 0.3), "b", "B")
+
+    assert cache.lookup(_unit(1, 0.28)) == ("b", "B")
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(answer_cache_module, "time", clock)
+    cache = SemanticAnswerCache(max_size=4, threshold=0.95, ttl_seconds=60)
+    cache.store(_unit(1, 0), "Restart the print spooler.", "Printing")
+
+    clock.now += 59
+    assert cache.lookup(_unit(1, 0)) is not None
+
+    clock.now += 2
+    assert cache.lookup(_unit(1, 0)) is None
+
+
+def test_zero_ttl_never_expires(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(answer_cache_module, "time", clock)
+    cache = SemanticAnswerCache(max_size=4, threshold=0.95, ttl_seconds=0)
+    cache.store(_unit(1, 0), "answer", "Cluster")
+
+    clock.now += 10 ** 9
+    assert cache.lookup(_unit(1, 0)) == ("answer", "Cluster")
+
+
+def test_size_is_bounded_oldest_replaced_first():
+    cache = SemanticAnswerCache(max_size=2, threshold=0.99)
+    cache.store(_unit(1, 0, 0), "first", "A")
+    cache.store(_unit(0, 1, 0), "second", "B")
+    cache.store(_unit(0, 0, 1), "third", "C")
+
+    assert cache.stats()["size"] == 2
+    assert cache.lookup(_unit(1, 0, 0)) is None
+    assert cache.lookup(_unit(0, 1, 0)) == ("second", "B")
+    assert cache.lookup(_unit(0, 0, 1)) == ("third", "C")
+
+
+def test_invalidate_drops_everything():
+    cache = SemanticAnswerCache(max_size=4, threshold=0.95)
+    cache.store(_unit(1, 0), "answer", "Cluster")
+
+    cache.invalidate()
+
+    assert cache.lookup(_unit(1, 0)) is None
+    assert cache.stats()["size"] == 0
+
+
+# Pipeline integration: needs the full RAG stack (skipped when it is not installed)
+@pytest.fixture
+def pipeline(monkeypatch):
+    """RAGPipeline with stubbed embedding, retrieval and LLM; counts LLM calls"""
+    pipeline_module = pytest.importorskip("app.rag.pipeline")
+    from app.rag import query_context
+
+    embeddings = {
+        "How do I reset a password?": _unit(1, 0),
+        "how do I reset my password?": _unit(1, 0.05),
+        "How do I map a network drive?": _unit(0, 1),
+    }
+    monkeypatch.setattr(query_context, "embed_text", lambda question: embeddings[question])
+    monkeypatch.setattr(pipeline_module.settings, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(pipeline_module.settings, "ANSWER_CACHE_SIMILARITY", 0.95)
+    monkeypatch.setattr(pipeline_module.settings, "ANSWER_CACHE_TTL_SECONDS", 3600)
+
+    llm_calls = []
+
+    def fake_generate_answer(question, context):
+        llm_calls.append(question)
+        return f"Answer {len(llm_calls)}"
+
+    monkeypatch.setattr(pipeline_module, "generate_answer", fake_generate_answer)
+
+    rag = pipeline_module.RAGPipeline(vector_store=object(), clustering=object())
+    rag._retrieve = lambda ctx, n_results=None, filters=None: ("Accounts", [{"document": "chunk"}])
+    rag._build_context = lambda results: "context"
+    rag.llm_calls = llm_calls
+    return rag
+
+
+def test_pipeline_serves_similar_question_from_cache(pipeline):
+    first = pipeline.query("How do I reset a password?")
+    second = pipeline.query("how do I reset my password?")
+
+    assert first == second == ("Answer 1", "Accounts")
+    assert len(pipeline.llm_calls) == 1
+
+
+def test_pipeline_calls_llm_for_different_question(pipeline):
+    pipeline.query("How do I reset a password?")
+    answer, _ = pipeline.query("How do I map a network drive?")
+
+    assert answer == "Answer 2"
+    assert len(pipeline.llm_calls) == 2
+
+
+@pytest.mark.parametrize("filters", [
+    {"document": "windows_10_troubleshooting.pdf", "chapter": None},
+    {"document": None, "chapter": "Chapter 18: Troubleshooting Startup"},
+])
+def test_pipeline_does_not_reuse_answers_across_filters(pipeline, filters):
+    pipeline.query("How do I reset a password?")
+    filtered, _ = pipeline.query("How do I reset a password?", filters=filters)
+    filtered_again, _ = pipeline.query("How do I reset a password?", filters=filters)
+
+    # A filtered answer is neither served from nor stored in the unfiltered cache
+    assert filtered == "Answer 2"
+    assert filtered_again == "Answer 3"
+    assert pipeline.query("How do I reset a password?")[0] == "Answer 1"
+
+
+def test_pipeline_does_not_cache_fallback_answers(pipeline, monkeypatch):
+    pipeline_module = pytest.importorskip("app.rag.pipeline")
+    monkeypatch.setattr(
+        pipeline_module, "generate_answer",
+        lambda question, context: pipeline.llm_calls.append(question) or "LLM connection error."
+    )
+
+    pipeline.query("How do I reset a password?")
+    pipeline.query("How do I reset a password?")
+
+    assert len(pipeline.llm_calls) == 2
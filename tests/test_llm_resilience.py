@@ -0,0 +1,169 @@
+"""LLM circuit breaker and concurrency limit"""
+import asyncio
+
+import pytest
+
+from app.core import resilience
+from app.core.resilience import CircuitBreaker, ConcurrencyLimit, LLMUnavailableError
+
+
+class FakeClock:
+    """Stand-in for the `time` module with a settable monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
+
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_fails_fast_until_reset(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    _open(breaker)
+
+    for _ in range(3):
+        with pytest.raises(LLMUnavailableError):
+            breaker.before_call()
+    clock.now += 29
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+    clock.now += 2
+    assert breaker.state == "half-open"
+
+
+def test_half_open_lets_a_single_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    _open(breaker)
+    clock.now += 31
+
+    assert breaker.before_call() is True
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    _open(breaker)
+    clock.now += 31
+
+    assert breaker.before_call() is True
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+
+def test_cancelled_trial_is_released(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    _open(breaker)
+    clock.now += 31
+
+    async def call():
+        # Same shape as GeminiClient.generate_async
+        trial = breaker.before_call()
+        try:
+            await asyncio.sleep(60)
+        finally:
+            if trial:
+                breaker.release_trial()
+
+    async def main():
+        task = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        with pytest.raises(LLMUnavailableError):
+            breaker.before_call()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+    # Neither closed nor reopened: the next call is a new trial
+    assert breaker.state == "half-open"
+    assert breaker.before_call() is True
+
+
+def test_limit_times_out_when_saturated():
+    slots = ConcurrencyLimit(1)
+    assert slots.acquire(timeout=0)
+
+    assert slots.acquire(timeout=0.01) is False
+    assert asyncio.run(slots.acquire_async(timeout=0.01)) is False
+    assert slots.in_use == 1
+
+
+def test_released_slot_goes_to_async_waiter():
+    slots = ConcurrencyLimit(1)
+
+    async def main():
+        assert await slots.acquire_async(timeout=1)
+        waiter = asyncio.create_task(slots.acquire_async(timeout=1))
+        await asyncio.sleep(0)
+        slots.release()
+        return await waiter
+
+    assert asyncio.run(main()) is True
+    assert slots.in_use == 1
+
+
+def test_cancelled_async_waiter_does_not_take_a_slot():
+    slots = ConcurrencyLimit(1)
+
+    async def main():
+        assert await slots.acquire_async(timeout=1)
+        cancelled = asyncio.create_task(slots.acquire_async(timeout=10))
+        other = asyncio.create_task(slots.acquire_async(timeout=1))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        slots.release()
+
+        assert await other is True
+        assert slots.in_use == 1
+        slots.release()
+        assert slots.in_use == 0
+
+    asyncio.run(main())